@@ -4,6 +4,7 @@ try:
     from frappe.utils import today, add_days, get_datetime
     from frappe.model.document import Document
     from frappe.auth import LoginManager
+    from library_management import analytics, archive, branches, catalogue, catalogue_index, changefeed, idempotency, inventory, ledger, profiler, ratelimit, recommendations, replica, reservations, responses, scanning, thumbnails
     FRAPPE_AVAILABLE = True
 except ImportError:
     # Frappe not available - this is normal when importing outside Frappe environment
@@ -15,14 +16,34 @@ except ImportError:
     get_datetime = None
     Document = None
     LoginManager = None
+    analytics = None
+    archive = None
+    branches = None
+    catalogue = None
+    catalogue_index = None
+    changefeed = None
+    idempotency = None
+    inventory = None
+    ledger = None
+    profiler = None
+    ratelimit = None
+    recommendations = None
+    replica = None
+    reservations = None
+    responses = None
+    scanning = None
+    thumbnails = None
 
 
-def rent_article(article=None):
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+@idempotency.idempotent()
+def rent_article(article=None, preferred_copy=None, branch=None):
     if not FRAPPE_AVAILABLE:
         return {"error": "Frappe not available"}
     """
     Rent an article for the current user via API.
-    Enforces membership, max rentals, Library Settings, and updates status.
+    Enforces membership, max rentals, Library Settings, and claims a free copy
+    at the request's branch (see library_management.branches).
     Returns frappe.response['success'] and ['message'] for REST consumption.
     """
     try:
@@ -35,14 +56,9 @@ def rent_article(article=None):
                 'message': 'Article name is required.'
             }
 
-        # Fetch library settings; fallback to defaults if not set
-        try:
-            library_settings = frappe.get_single("Library Settings")
-            loan_period = library_settings.loan_period or 14
-            max_articles = library_settings.max_articles_per_user or 3
-        except Exception:
-            loan_period = 14
-            max_articles = 3
+        # Branch limits override Library Settings, which fall back to defaults
+        branch = branches.get_current_branch(branch)
+        max_articles = branches.get_branch_setting("max_articles_per_user", branch)
 
         # Get user's email from current session
         user_email = frappe.get_value('User', frappe.session.user, 'email')
@@ -76,22 +92,23 @@ def rent_article(article=None):
                 'message': 'You need an active library membership to rent articles.'
             }
 
-        # Count currently rented articles (not yet returned)
+        # Count currently rented articles (not yet returned) at every branch: the
+        # limit is per member, the branch only decides how high it is
         current_rentals = frappe.db.sql("""
             SELECT COUNT(*) as count FROM `tabLibrary Transaction` lt
-            WHERE lt.library_member = %s
+            WHERE lt.library_member = %(member)s
             AND lt.type = 'Issue'
             AND lt.docstatus = 1
             AND NOT EXISTS (
                 SELECT 1
                 FROM `tabLibrary Transaction` lt2
-                WHERE lt2.library_member = %s
+                WHERE lt2.library_member = %(member)s
                 AND lt2.article = lt.article
                 AND lt2.type = 'Return'
                 AND lt2.docstatus = 1
                 AND lt2.date >= lt.date
             )
-        """, (library_member, library_member), as_dict=True)
+        """, {"member": library_member}, as_dict=True)
         
         if current_rentals and current_rentals[0].count >= max_articles:
             return {
@@ -99,42 +116,40 @@ def rent_article(article=None):
                 'message': f'You have reached the maximum limit of {max_articles} articles. Please return some articles before renting new ones.'
             }
 
-        # Get the Article document
-        doc = frappe.get_doc("Article", article)
-        if doc.status != "Available":
+        # A member collecting their hold takes the copy set aside for them;
+        # everyone else claims a free copy (concurrent rentals lock different copies)
+        article_copy = reservations.collect_allocated_copy(article, library_member)
+        from_shelf = not article_copy
+        if from_shelf:
+            article_copy = inventory.claim_copy(article, preferred_copy, branch)
+        if not article_copy:
             return {
                 'success': False,
                 'message': 'This article is not available for rent.'
             }
 
-        # Create Library Transaction to perform the rental
-        frappe.flags.ignore_permissions = True  # Ensure operation is permitted
-        txn = frappe.get_doc({
-            "doctype": "Library Transaction",
-            "article": article,
-            "library_member": library_member,
-            "date": frappe.utils.today(),
-            "type": "Issue"
-        })
-        txn.insert(ignore_permissions=True)
-        txn.submit()
+        # Append the Issue to the circulation ledger (one INSERT, no document lifecycle)
+        txn = ledger.record_issue(article, article_copy, library_member)
+
+        # Renting from the shelf satisfies any place the member still holds in the queue
+        if from_shelf:
+            reservations.cancel_waiting_hold(article, library_member)
 
-        # Update Article status to 'Issued'
-        doc.reload()
-        doc.status = "Issued"
-        doc.save(ignore_permissions=True)
+        # Decrement the availability counter last so the Article row is locked briefly
+        if from_shelf:
+            inventory.adjust_available(article, -1)
         
         # Commit the transaction to database
         frappe.db.commit()
 
-        # Calculate and set due date from loan_period
-        from frappe.utils import add_days
-        due_date = add_days(frappe.utils.today(), loan_period)
+        # Due date comes from the branch's loan_period
+        due_date = txn.due_date
 
         return {
             'success': True,
             'message': f'You have successfully rented the article! Due date: {due_date}',
             'transaction_id': txn.name,
+            'article_copy': article_copy,
             'due_date': str(due_date)
         }
 
@@ -148,11 +163,13 @@ def rent_article(article=None):
 
 
 @frappe.whitelist(allow_guest=False, methods=['POST', 'GET'])
+@idempotency.idempotent()
 def return_article(transaction=None):
     """
     Return a rented article.
     Ensures only 'Issue' transactions are processed, prevents duplicate returns,
-    creates a 'Return' transaction, and updates the Article status.
+    creates a 'Return' transaction, and hands the copy to the next holder in
+    the reservation queue or puts it back on the shelf.
     """
     try:
         # Get transaction parameter from multiple sources
@@ -175,8 +192,20 @@ def return_article(transaction=None):
                 'message': 'Transaction ID is required.'
             }
         
-        # Get the transaction document by ID
-        txn = frappe.get_doc("Library Transaction", transaction)
+        # Lock the Issue: concurrent returns of the same loan queue here, and the
+        # second one then sees the first one's Return
+        txn = frappe.db.sql("""
+            SELECT name, type, docstatus, article, article_copy, library_member, date
+            FROM `tabLibrary Transaction`
+            WHERE name = %s
+            FOR UPDATE
+        """, (transaction,), as_dict=True)
+        txn = txn[0] if txn else None
+        if not txn or txn.docstatus != 1:
+            return {
+                'success': False,
+                'message': 'Rental transaction not found.'
+            }
 
         # Only allow rental transactions of type 'Issue' to be returned
         if txn.type != "Issue":
@@ -185,28 +214,34 @@ def return_article(transaction=None):
                 'message': 'This is not a rental transaction.'
             }
         
-        # Note: We removed the duplicate return check as it was preventing legitimate returns
-        # after re-renting the same article
+        # Returns are linked to their Issue, so a repeated return of the same loan is
+        # caught without blocking a later return after re-renting the same article.
+        # A locking read, so it sees Returns committed after this transaction's snapshot.
+        linked_return = frappe.db.sql("""
+            SELECT name
+            FROM `tabLibrary Transaction`
+            WHERE issue_transaction = %s
+            AND type = 'Return'
+            AND docstatus = 1
+            LIMIT 1
+            FOR UPDATE
+        """, (txn.name,))
+        # Returns recorded before the link existed pair by member, article and date
+        if linked_return or archive.get_legacy_return(txn):
+            return {
+                'success': False,
+                'message': 'This article has already been returned.'
+            }
         
-        # Ignore permissions for return operation
-        frappe.flags.ignore_permissions = True
+        # Loans issued before copies existed carry no copy; pick one that is out
+        article_copy = txn.article_copy or inventory.find_unavailable_copy(txn.article)
 
-        # Create the library return transaction
-        return_txn = frappe.get_doc({
-            "doctype": "Library Transaction",
-            "article": txn.article,
-            "library_member": txn.library_member,
-            "date": frappe.utils.today(),
-            "type": "Return"
-        })
-        return_txn.insert(ignore_permissions=True)
-        return_txn.submit()
+        # Append the Return to the circulation ledger, linked to its Issue
+        ledger.record_return(txn, article_copy)
 
-        # Update the corresponding article status to 'Available'
-        article = frappe.get_doc("Article", txn.article)
-        article.reload()
-        article.status = "Available"
-        article.save(ignore_permissions=True)
+        # Allocate the copy to the next eligible holder, else release it to the shelf
+        if article_copy:
+            reservations.hand_over_or_release(txn.article, article_copy)
         
         # Commit the transaction to database
         frappe.db.commit()
@@ -226,7 +261,241 @@ def return_article(transaction=None):
         }
 
 
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def scan_checkout(code=None):
+    """
+    Rent the article behind a scanned ISBN or copy barcode for the current user.
+    A scanned copy barcode issues that exact copy when it is on the shelf.
+    """
+    try:
+        code = code or frappe.form_dict.get('code')
+        scanned = scanning.resolve(code)
+        if not scanned:
+            return {
+                'success': False,
+                'message': f'No article found for code {code}.'
+            }
+
+        result = rent_article(scanned['article'], preferred_copy=scanned['article_copy'])
+        result['article'] = scanned['article']
+        return result
+
+    except Exception as e:
+        frappe.log_error("Error in scan_checkout: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error checking out scanned article: ' + str(e)
+        }
+
+
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def scan_return(code=None):
+    """
+    Return the loan behind a scanned code: the open loan of a scanned copy
+    barcode, or the current user's open loan of a scanned ISBN.
+    """
+    try:
+        code = code or frappe.form_dict.get('code')
+        scanned = scanning.resolve(code)
+        if not scanned:
+            return {
+                'success': False,
+                'message': f'No article found for code {code}.'
+            }
+
+        if scanned['article_copy']:
+            transaction = scanning.get_open_issue(article_copy=scanned['article_copy'])
+        else:
+            user_email = frappe.get_value('User', frappe.session.user, 'email')
+            library_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+            transaction = library_member and scanning.get_open_issue(
+                article=scanned['article'], library_member=library_member
+            )
+
+        if not transaction:
+            return {
+                'success': False,
+                'message': 'No open loan found for the scanned item.'
+            }
+
+        result = return_article(transaction)
+        result['article'] = scanned['article']
+        return result
+
+    except Exception as e:
+        frappe.log_error("Error in scan_return: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error returning scanned article: ' + str(e)
+        }
+
+
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def reserve_article(article=None):
+    """
+    Place a hold on an article that has no free copy.
+    Returns the reservation and the member's position in the queue.
+    """
+    try:
+        article = article or frappe.form_dict.get('article')
+        if not article:
+            return {
+                'success': False,
+                'message': 'Article name is required.'
+            }
+
+        user_email = frappe.get_value('User', frappe.session.user, 'email')
+        library_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+        if not library_member:
+            return {
+                'success': False,
+                'message': 'No library member found for your account.'
+            }
+
+        today_date = frappe.utils.today()
+        if not frappe.db.exists('Library Membership', {
+            'library_member': library_member,
+            'from_date': ['<=', today_date],
+            'to_date': ['>=', today_date]
+        }):
+            return {
+                'success': False,
+                'message': 'You need an active library membership to reserve articles.'
+            }
+
+        available_copies = frappe.db.get_value("Article", article, "available_copies")
+        if available_copies is None:
+            return {
+                'success': False,
+                'message': 'Article not found'
+            }
+
+        # A copy set aside for this member is collected, i.e. rented to them
+        hold = reservations.get_active_reservation(article, library_member)
+        if hold and hold.status == "Allocated":
+            result = rent_article(article)
+            result['collected'] = bool(result.get('success'))
+            return result
+        if available_copies > 0:
+            return {
+                'success': False,
+                'message': 'A copy is available right now - rent it instead of reserving.'
+            }
+
+        reservation = reservations.place_hold(article, library_member)
+        frappe.db.commit()
+
+        position = reservations.get_position(reservation)
+        return {
+            'success': True,
+            'message': f'Reservation placed. You are number {position} in the queue.' if position else 'A copy is already set aside for you.',
+            'reservation': reservation,
+            'position': position
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in reserve_article: " + str(e))
+        frappe.db.rollback()
+        return {
+            'success': False,
+            'message': 'Error reserving article: ' + str(e)
+        }
+
+
+def get_my_hold(article):
+    """The current user's active hold on `article` as {status, position}, or None."""
+    if frappe.session.user == "Guest":
+        return None
+    user_email = frappe.get_value('User', frappe.session.user, 'email')
+    library_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+    hold = library_member and reservations.get_active_reservation(article, library_member)
+    if not hold:
+        return None
+    return {
+        'reservation': hold.name,
+        'status': hold.status,
+        'position': reservations.get_position(hold.name)
+    }
+
 @frappe.whitelist(allow_guest=False)
+def get_reservation_position(reservation=None):
+    """
+    Get the queue position of one of the current user's reservations.
+    """
+    try:
+        reservation = reservation or frappe.form_dict.get('reservation')
+        user_email = frappe.get_value('User', frappe.session.user, 'email')
+        library_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+
+        hold = frappe.db.get_value(
+            "Article Reservation", reservation,
+            ["name", "article", "library_member", "status", "article_copy"], as_dict=True
+        ) if reservation else None
+        if not hold or hold.library_member != library_member:
+            return {
+                'success': False,
+                'message': 'Reservation not found.'
+            }
+
+        return {
+            'success': True,
+            'reservation': hold.name,
+            'article': hold.article,
+            'status': hold.status,
+            'position': reservations.get_position(hold.name),
+            'article_copy': hold.article_copy
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in get_reservation_position: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error retrieving reservation: ' + str(e)
+        }
+
+
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def cancel_reservation(reservation=None):
+    """
+    Cancel one of the current user's reservations.
+    A copy already set aside for it moves on to the next holder.
+    """
+    try:
+        reservation = reservation or frappe.form_dict.get('reservation')
+        user_email = frappe.get_value('User', frappe.session.user, 'email')
+        library_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+
+        owner = frappe.db.get_value("Article Reservation", reservation, "library_member") if reservation else None
+        if not owner or owner != library_member:
+            return {
+                'success': False,
+                'message': 'Reservation not found.'
+            }
+
+        if not reservations.cancel(reservation):
+            return {
+                'success': False,
+                'message': 'This reservation is no longer active.'
+            }
+        frappe.db.commit()
+
+        return {
+            'success': True,
+            'message': 'Reservation cancelled.'
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in cancel_reservation: " + str(e))
+        frappe.db.rollback()
+        return {
+            'success': False,
+            'message': 'Error cancelling reservation: ' + str(e)
+        }
+
+
+@frappe.whitelist(allow_guest=False)
+@responses.columnar("data")
+@replica.read_only(max_lag=5)
 def get_rented_articles():
     """
     Get all currently rented articles for the current user.
@@ -252,7 +521,9 @@ def get_rented_articles():
                     'last_name': last_name,
                     'email': user_email
                 })
-                library_member_doc.insert(ignore_permissions=True)
+                # This endpoint may be served from the replica; the insert must go to the primary
+                with replica.primary_connection():
+                    library_member_doc.insert(ignore_permissions=True)
                 library_member = library_member_doc.name
                 frappe.logger().info(f"🔍 DEBUG: Created new Library Member: {library_member}")
             except Exception as e:
@@ -321,6 +592,7 @@ def get_rented_articles():
 
 
 @frappe.whitelist()
+@idempotency.idempotent()
 def join_membership():
     """
     Create a new library membership for the current user.
@@ -459,17 +731,20 @@ def check_membership_eligibility():
 
 
 @frappe.whitelist(allow_guest=True)
-def get_library_settings():
+@ratelimit.rate_limit(cost=1)
+@replica.read_only(max_lag=300)
+def get_library_settings(branch=None):
     """
     Get current library settings for display purposes.
-    Returns loan period and max articles.
+    Returns loan period and max articles, with the branch's overrides applied.
     """
     try:
-        library_settings = frappe.get_single("Library Settings")
+        branch = branches.get_current_branch(branch)
         return {
             'success': True,
-            'loan_period': library_settings.loan_period or 14,
-            'max_articles_per_user': library_settings.max_articles_per_user or 3,
+            'branch': branch,
+            'loan_period': branches.get_branch_setting("loan_period", branch),
+            'max_articles_per_user': branches.get_branch_setting("max_articles_per_user", branch),
             'message': 'Library settings retrieved successfully'
         }
     except Exception as e:
@@ -483,6 +758,8 @@ def get_library_settings():
 
 
 @frappe.whitelist(allow_guest=True)
+@ratelimit.rate_limit(cost=2)
+@replica.read_only(max_lag=10)
 def get_article_details(article_name):
     """
     Get detailed information for a specific article.
@@ -495,45 +772,20 @@ def get_article_details(article_name):
                 'message': 'Article name is required'
             }
         
-        # Query specific article with all fields
-        article = frappe.db.sql("""
-            SELECT 
-                name,
-                section_break_wvtm as title,
-                author,
-                description,
-                status,
-                creation,
-                publisher,
-                isbn,
-                route,
-                image
-            FROM `tabArticle`
-            WHERE name = %s
-        """, (article_name,), as_dict=True)
+        formatted_article = load_article_details(article_name)
         
-        if not article:
+        # Not an Article name: accept a scanned ISBN or copy barcode
+        if not formatted_article:
+            scanned = scanning.resolve(article_name)
+            if scanned:
+                formatted_article = load_article_details(scanned['article'])
+        
+        if not formatted_article:
             return {
                 'success': False,
                 'message': 'Article not found'
             }
         
-        article = article[0]  # Get first (and only) result
-        
-        # Format the article data
-        formatted_article = {
-            'name': article.name,
-            'title': article.title or article.name,
-            'author': article.author,
-            'description': article.description,
-            'status': article.status,
-            'publisher': article.publisher,
-            'isbn': article.isbn,
-            'image': article.image,
-            'creation': article.creation,
-            'route': article.route
-        }
-        
         return {
             'success': True,
             'message': 'Article details retrieved successfully',
@@ -547,47 +799,111 @@ def get_article_details(article_name):
             'message': 'Error retrieving article details: ' + str(e)
         }
 
+
+def load_article_details(article_name):
+    """Formatted detail data for one Article, or None. Not rate limited; callers are."""
+    # Query specific article with all fields
+    article = frappe.db.sql("""
+        SELECT 
+            name,
+            section_break_wvtm as title,
+            author,
+            description,
+            status,
+            total_copies,
+            available_copies,
+            creation,
+            publisher,
+            isbn,
+            route,
+            attach_image_pfdz as image,
+            image_hash
+        FROM `tabArticle`
+        WHERE name = %s
+    """, (article_name,), as_dict=True)
+    
+    if not article:
+        return None
+    
+    article = article[0]  # Get first (and only) result
+    
+    # Format the article data
+    return {
+        'name': article.name,
+        'title': article.title or article.name,
+        'author': article.author,
+        'description': article.description,
+        'status': article.status,
+        'total_copies': article.total_copies,
+        'available_copies': article.available_copies,
+        'publisher': article.publisher,
+        'isbn': article.isbn,
+        'image': article.image,
+        'thumbnails': thumbnails.get_thumbnail_urls(article.image_hash),
+        'thumbnail_srcset': thumbnails.get_srcset(article.image_hash),
+        'creation': article.creation,
+        'route': article.route,
+        'my_hold': get_my_hold(article.name)
+    }
+
 @frappe.whitelist(allow_guest=True)
-def get_articles():
+@ratelimit.rate_limit(cost=2)
+def get_article_recommendations(article_name=None, limit=5):
+    """
+    Get articles most often borrowed by members who also borrowed this one.
+    Served from the precomputed Article Recommendation table.
+    """
+    try:
+        article_name = article_name or frappe.form_dict.get('article_name')
+        if not article_name:
+            return {
+                'success': False,
+                'message': 'Article name is required',
+                'data': []
+            }
+
+        limit = min(frappe.utils.cint(limit) or 5, recommendations.TOP_K)
+        data = recommendations.get_recommendations(article_name, limit)
+
+        return {
+            'success': True,
+            'message': f'Found {len(data)} recommendations',
+            'data': data
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in get_article_recommendations: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error retrieving recommendations: ' + str(e),
+            'data': []
+        }
+
+
+@frappe.whitelist(allow_guest=True)
+@ratelimit.rate_limit(cost=10, concurrency=4)
+@responses.columnar("articles")
+@replica.read_only(max_lag=30)
+def get_articles(branch=None):
     """
     Get all articles with their details for the articles page.
-    Returns list with formatted metadata for UI.
+    Returns list with formatted metadata for UI; with a branch, only articles
+    held there, with that branch's copy counts.
     """
     try:
-        # Query all articles, select relevant fields, order by newest first
-        articles = frappe.db.sql("""
-            SELECT 
-                name,
-                section_break_wvtm as title,
-                author,
-                description,
-                status,
-                creation,
-                publisher,
-                isbn,
-                route
-            FROM `tabArticle`
-            ORDER BY creation DESC
-        """, as_dict=True)
-        
-        # Prepare formatted data for frontend cards/lists
-        formatted_articles = []
-        for article in articles:
-            formatted_article = {
-                'name': article.name,
-                'title': article.title or article.name,
-                'author': article.author,
-                'description': article.description,
-                'status': article.status,
-                'creation': article.creation,
-                'publisher': article.publisher,
-                'isbn': article.isbn,
-                'route': article.route,
-                'formatted_date': frappe.utils.formatdate(article.creation),
-                # Short preview for UI (first 150 chars)
-                'description_preview': (article.description[:150] + '...') if article.description and len(article.description) > 150 else article.description
-            }
-            formatted_articles.append(formatted_article)
+        branch = branches.get_current_branch(branch)
+        if branch:
+            formatted_articles = branches.get_branch_listing(branch)
+        else:
+            # Query all articles, select relevant fields, order by newest first
+            articles = frappe.db.sql(f"""
+                SELECT {catalogue.LISTING_COLUMNS}
+                FROM `tabArticle`
+                ORDER BY creation DESC
+            """, as_dict=True)
+            
+            # Prepare formatted data for frontend cards/lists (same shape as the static catalogue snapshot)
+            formatted_articles = [catalogue.format_listing_row(article) for article in articles]
         
         return {
             'success': True,
@@ -607,6 +923,67 @@ def get_articles():
         }
 
 
+@frappe.whitelist(allow_guest=True)
+@ratelimit.rate_limit(cost=2)
+def search_catalogue(status=None, author=None, publisher=None, sort='creation', order='desc', start=0, limit=20):
+    """
+    Filtered, sorted and counted catalogue page. Answered from the worker's
+    in-memory catalogue index when enabled, otherwise from the database.
+    """
+    try:
+        if sort not in catalogue_index.SORT_FIELDS:
+            return {
+                'success': False,
+                'message': f'Cannot sort by {sort}.'
+            }
+
+        query = {
+            'status': status,
+            'author': author,
+            'publisher': publisher,
+            'sort': sort,
+            'descending': order != 'asc',
+            'start': max(frappe.utils.cint(start), 0),
+            'limit': min(max(frappe.utils.cint(limit), 1), 100),
+        }
+
+        index = catalogue_index.get_index()
+        if index:
+            total, names = index.query(**query)
+            status_counts = index.status_counts()
+        else:
+            total, names = catalogue_index.query_sql(**query)
+            status_counts = catalogue_index.status_counts_sql()
+
+        articles = []
+        if names:
+            rows = frappe.db.sql(f"""
+                SELECT {catalogue.LISTING_COLUMNS}
+                FROM `tabArticle`
+                WHERE name IN %(names)s
+            """, {'names': names}, as_dict=True)
+            by_name = {row.name: catalogue.format_listing_row(row) for row in rows}
+            articles = [by_name[name] for name in names if name in by_name]
+
+        return {
+            'success': True,
+            'message': f'Found {total} articles',
+            'articles': articles,
+            'count': total,
+            'status_counts': status_counts,
+            'indexed': bool(index)
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in search_catalogue: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error searching catalogue: ' + str(e),
+            'articles': [],
+            'count': 0
+        }
+
+
 @frappe.whitelist(allow_guest=True)
 def login(email: str = None, password: str = None, next: str = None):
     """
@@ -860,6 +1237,7 @@ def signup(full_name: str = None, email: str = None, password: str = None, redir
 
 # Debug Rentals (For Admin/Dev Use)
 @frappe.whitelist(allow_guest=False)
+@responses.columnar("debug.all_transactions", "debug.all_memberships")
 def debug_rented_articles():
     """
     Debug method to check all rented articles, transactions, and memberships for current user.
@@ -882,18 +1260,8 @@ def debug_rented_articles():
                 'debug': debug_info
             }
         
-        all_transactions = frappe.db.sql("""
-            SELECT 
-                name,
-                article,
-                library_member,
-                type,
-                date,
-                docstatus
-            FROM `tabLibrary Transaction`
-            WHERE library_member = %s
-            ORDER BY date DESC
-        """, (library_member,), as_dict=True)
+        # Includes closed loans already moved to the archive
+        all_transactions = archive.get_member_transactions(library_member)
         
         all_memberships = frappe.db.sql("""
             SELECT 
@@ -927,8 +1295,70 @@ def debug_rented_articles():
         }
 
 
+# Roles that run the library desk; they can read any member's data and start library-wide jobs
+LIBRARIAN_ROLES = ("Librarian", "Library Manager", "System Manager")
+
+
+def is_librarian():
+    return bool(set(frappe.get_roles()) & set(LIBRARIAN_ROLES))
+
+
+def require_librarian():
+    """Raise frappe.PermissionError unless the user has one of LIBRARIAN_ROLES."""
+    frappe.only_for(LIBRARIAN_ROLES)
+
+
+@frappe.whitelist(allow_guest=False)
+@responses.columnar("data")
+@replica.read_only(max_lag=5)
+def get_member_history(library_member=None, cursor=None, limit=50, type=None, article=None):
+    """
+    One page of a member's circulation history (live and archived), newest
+    first, with article titles. Pass the returned next_cursor to get the next
+    page. Librarians can read any member; members only their own history.
+    """
+    try:
+        if not is_librarian():
+            user_email = frappe.get_value('User', frappe.session.user, 'email')
+            own_member = frappe.db.get_value("Library Member", {"email": user_email}, "name")
+            if not own_member or (library_member and library_member != own_member):
+                return {
+                    'success': False,
+                    'message': 'You can only view your own history.',
+                    'data': []
+                }
+            library_member = own_member
+
+        if not library_member:
+            return {
+                'success': False,
+                'message': 'Library member is required.',
+                'data': []
+            }
+
+        limit = min(max(frappe.utils.cint(limit) or 50, 1), 200)
+        rows, next_cursor = archive.get_member_history(
+            library_member, cursor=cursor, limit=limit, txn_type=type, article=article
+        )
+
+        return {
+            'success': True,
+            'message': f'Found {len(rows)} transactions',
+            'data': rows,
+            'next_cursor': next_cursor
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in get_member_history: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error retrieving member history: ' + str(e),
+            'data': []
+        }
+
 # Membership Status
 @frappe.whitelist(allow_guest=False)
+@replica.read_only(max_lag=5)
 def get_membership_status():
     """
     Get the current user's membership status.
@@ -979,6 +1409,151 @@ def get_membership_status():
         }
 
 
+# Circulation Analytics (For Librarians)
+@frappe.whitelist(allow_guest=False)
+def get_circulation_analytics(from_date=None, to_date=None, top=10):
+    """
+    Most-borrowed articles, daily issue/return counts, active members and
+    copy utilisation for a date range (defaults to the last 30 days).
+    Reads only the circulation rollups, never tabLibrary Transaction.
+    """
+    require_librarian()
+
+    try:
+        to_date = to_date or frappe.utils.today()
+        from_date = from_date or add_days(to_date, -30)
+        summary = analytics.get_summary(from_date, to_date, frappe.utils.cint(top) or 10)
+
+        return {
+            'success': True,
+            'message': 'Circulation analytics retrieved successfully',
+            'from_date': str(from_date),
+            'to_date': str(to_date),
+            'data': summary
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in get_circulation_analytics: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error retrieving circulation analytics: ' + str(e),
+            'data': {}
+        }
+
+
+@frappe.whitelist(allow_guest=False)
+def changes_since(seq=0, limit=500):
+    """
+    Incremental sync for external mirrors: Article, Library Transaction and
+    Library Membership changes with a sequence number above `seq`, oldest
+    first. Pass the returned `last_seq` as `seq` on the next call.
+    """
+    require_librarian()
+
+    try:
+        seq = frappe.utils.cint(seq)
+        limit = min(max(frappe.utils.cint(limit), 1), 1000)
+        changes = changefeed.get_changes_since(seq, limit)
+
+        return {
+            'success': True,
+            'message': f'Found {len(changes)} changes',
+            'last_seq': changes[-1].seq if changes else seq,
+            'has_more': len(changes) == limit,
+            'data': changes
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in changes_since: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error retrieving changes: ' + str(e),
+            'data': []
+        }
+
+
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def enrich_catalogue(concurrency=None):
+    """
+    Queue a background job that fills missing author, publisher, description
+    and image of Articles from their ISBN.
+    """
+    require_librarian()
+
+    try:
+        frappe.enqueue(
+            "library_management.enrichment.enrich_articles",
+            queue="long",
+            timeout=4 * 3600,
+            job_id="library_management_isbn_enrichment",
+            deduplicate=True,
+            concurrency=frappe.utils.cint(concurrency) or None,
+        )
+
+        return {
+            'success': True,
+            'message': 'Catalogue enrichment has been queued'
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in enrich_catalogue: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error queueing catalogue enrichment: ' + str(e)
+        }
+
+
+@frappe.whitelist(allow_guest=False)
+def download_profile(profile=None):
+    """Download a stored API Profile as a pstats file (System Manager only)."""
+    frappe.only_for("System Manager")
+
+    content = profiler.get_pstats_file(profile)
+    if not content:
+        frappe.throw(_("Profile {0} not found").format(profile), frappe.DoesNotExistError)
+
+    frappe.local.response.filename = f"{profile}.prof"
+    frappe.local.response.filecontent = content
+    frappe.local.response.type = "download"
+
+
+@frappe.whitelist(allow_guest=False, methods=['POST'])
+def bulk_enrol_members(file_url=None, renew=0):
+    """
+    Queue enrolment (and optionally renewal) of every member in an uploaded
+    CSV file with email, first_name and last_name columns.
+    """
+    require_librarian()
+
+    try:
+        file_name = frappe.db.get_value("File", {"file_url": file_url}, "name") if file_url else None
+        if not file_name:
+            return {
+                'success': False,
+                'message': 'Upload the member list first and pass its file_url.'
+            }
+
+        frappe.enqueue(
+            "library_management.enrolment.enrol_from_csv",
+            queue="long",
+            timeout=3600,
+            path=frappe.get_doc("File", file_name).get_full_path(),
+            renew=bool(frappe.utils.cint(renew)),
+        )
+
+        return {
+            'success': True,
+            'message': 'Bulk enrolment has been queued'
+        }
+
+    except Exception as e:
+        frappe.log_error("Error in bulk_enrol_members: " + str(e))
+        return {
+            'success': False,
+            'message': 'Error queueing bulk enrolment: ' + str(e)
+        }
+
+
 def rent_article_handler(doc, method):
     """
     Handler for Library Transaction before_save event.
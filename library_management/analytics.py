@@ -0,0 +1,259 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Circulation rollups.
+
+`Article Circulation Daily` (per article per day) and `Member Circulation
+Monthly` (per member per month) are bumped with a single upsert whenever a
+Library Transaction is submitted or cancelled, so analytics read a few
+pre-aggregated rows instead of grouping the whole transaction history.
+Row names are a hash of the rollup key, which makes every update an
+INSERT ... ON DUPLICATE KEY UPDATE on the primary key.
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import add_months, get_first_day, getdate, now, today
+
+ARTICLE_DAILY = "Article Circulation Daily"
+MEMBER_MONTHLY = "Member Circulation Monthly"
+
+
+def rollup_key(*parts):
+	# Must match the MD5(CONCAT_WS('|', ...)) used by the SQL backfill below
+	return hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def record_event(article, library_member, date, txn_type, delta):
+	"""Apply one Issue/Return (delta +1, or -1 for a cancellation) to both rollups."""
+	if txn_type not in ("Issue", "Return"):
+		return
+
+	date = getdate(date)
+	month = get_first_day(date)
+	issues, returns = (delta, 0) if txn_type == "Issue" else (0, delta)
+	timestamp = now()
+
+	if article:
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabArticle Circulation Daily`
+				(name, creation, modified, modified_by, owner, article, date, issues, returns)
+			VALUES (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator',
+				%(article)s, %(date)s, %(issues)s, %(returns)s)
+			ON DUPLICATE KEY UPDATE
+				issues = issues + VALUES(issues),
+				returns = returns + VALUES(returns),
+				modified = VALUES(modified)
+			""",
+			{
+				"name": rollup_key(article, date),
+				"now": timestamp,
+				"article": article,
+				"date": date,
+				"issues": issues,
+				"returns": returns,
+			},
+		)
+
+	if library_member:
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabMember Circulation Monthly`
+				(name, creation, modified, modified_by, owner, library_member, month, issues, returns)
+			VALUES (%(name)s, %(now)s, %(now)s, 'Administrator', 'Administrator',
+				%(member)s, %(month)s, %(issues)s, %(returns)s)
+			ON DUPLICATE KEY UPDATE
+				issues = issues + VALUES(issues),
+				returns = returns + VALUES(returns),
+				modified = VALUES(modified)
+			""",
+			{
+				"name": rollup_key(library_member, month),
+				"now": timestamp,
+				"member": library_member,
+				"month": month,
+				"issues": issues,
+				"returns": returns,
+			},
+		)
+
+
+def rebuild_rollups(months_per_batch=1):
+	"""
+	Recompute both rollups from live and archived transactions. Run via
+	`bench execute library_management.analytics.rebuild_rollups`.
+
+	The rollups are filled into empty staging copies, one date range per
+	commit, and then swapped in with a single RENAME TABLE, so readers see
+	the old rollups until the new ones are complete. Transactions submitted
+	between the backfill of the current month and the swap are not counted,
+	so run it outside opening hours.
+	"""
+	bounds = frappe.db.sql(
+		"""
+		SELECT MIN(d), MAX(d) FROM (
+			SELECT MIN(date) AS d FROM `tabLibrary Transaction` WHERE docstatus = 1
+			UNION ALL SELECT MAX(date) FROM `tabLibrary Transaction` WHERE docstatus = 1
+			UNION ALL SELECT MIN(date) FROM `tabLibrary Transaction Archive`
+		) b
+		"""
+	)
+	start, end = bounds[0] if bounds else (None, None)
+	if not start:
+		return
+
+	for doctype in (ARTICLE_DAILY, MEMBER_MONTHLY):
+		frappe.db.sql_ddl(f"DROP TABLE IF EXISTS `{staging_table(doctype)}`")
+		frappe.db.sql_ddl(f"CREATE TABLE `{staging_table(doctype)}` LIKE `tab{doctype}`")
+
+	start = get_first_day(start)
+	end = getdate(end or today())
+	while start <= end:
+		stop = add_months(start, months_per_batch)
+		backfill_range(start, stop, staging=True)
+		frappe.db.commit()
+		start = stop
+
+	# One RENAME TABLE is atomic across all of its renames
+	frappe.db.sql_ddl(
+		"RENAME TABLE "
+		+ ", ".join(
+			f"`tab{doctype}` TO `{retired_table(doctype)}`, `{staging_table(doctype)}` TO `tab{doctype}`"
+			for doctype in (ARTICLE_DAILY, MEMBER_MONTHLY)
+		)
+	)
+	for doctype in (ARTICLE_DAILY, MEMBER_MONTHLY):
+		frappe.db.sql_ddl(f"DROP TABLE `{retired_table(doctype)}`")
+
+
+def staging_table(doctype):
+	return f"tab{doctype} Rebuild"
+
+
+def retired_table(doctype):
+	return f"tab{doctype} Retired"
+
+
+def backfill_range(from_date, to_date, staging=False):
+	"""Aggregate transactions in [from_date, to_date) into the rollups (set-based)."""
+	article_table, member_table = (
+		(staging_table(ARTICLE_DAILY), staging_table(MEMBER_MONTHLY))
+		if staging
+		else (f"tab{ARTICLE_DAILY}", f"tab{MEMBER_MONTHLY}")
+	)
+	source = """
+		SELECT article, library_member, date, type
+		FROM `tabLibrary Transaction`
+		WHERE docstatus = 1 AND date >= %(from_date)s AND date < %(to_date)s
+		UNION ALL
+		SELECT article, library_member, date, type
+		FROM `tabLibrary Transaction Archive`
+		WHERE date >= %(from_date)s AND date < %(to_date)s
+	"""
+	values = {"from_date": from_date, "to_date": to_date, "now": now()}
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO `{article_table}`
+			(name, creation, modified, modified_by, owner, article, date, issues, returns)
+		SELECT MD5(CONCAT_WS('|', t.article, t.date)), %(now)s, %(now)s, 'Administrator', 'Administrator',
+			t.article, t.date, SUM(t.type = 'Issue'), SUM(t.type = 'Return')
+		FROM ({source}) t
+		WHERE t.article IS NOT NULL
+		GROUP BY t.article, t.date
+		ON DUPLICATE KEY UPDATE
+			issues = issues + VALUES(issues),
+			returns = returns + VALUES(returns)
+		""",
+		values,
+	)
+	frappe.db.sql(
+		f"""
+		INSERT INTO `{member_table}`
+			(name, creation, modified, modified_by, owner, library_member, month, issues, returns)
+		SELECT MD5(CONCAT_WS('|', t.library_member, t.month)), %(now)s, %(now)s, 'Administrator', 'Administrator',
+			t.library_member, t.month, SUM(t.type = 'Issue'), SUM(t.type = 'Return')
+		FROM (
+			SELECT library_member, type, CAST(DATE_FORMAT(date, '%%Y-%%m-01') AS DATE) AS month
+			FROM ({source}) s
+			WHERE library_member IS NOT NULL
+		) t
+		GROUP BY t.library_member, t.month
+		ON DUPLICATE KEY UPDATE
+			issues = issues + VALUES(issues),
+			returns = returns + VALUES(returns)
+		""",
+		values,
+	)
+
+
+def get_summary(from_date, to_date, top=10):
+	"""Read-only analytics over the rollups for [from_date, to_date]."""
+	values = {
+		"from_date": getdate(from_date),
+		"to_date": getdate(to_date),
+		"from_month": get_first_day(from_date),
+		"top": top,
+	}
+
+	most_borrowed = frappe.db.sql(
+		"""
+		SELECT r.article, a.section_break_wvtm AS title, r.issues
+		FROM (
+			SELECT article, SUM(issues) AS issues
+			FROM `tabArticle Circulation Daily`
+			WHERE date BETWEEN %(from_date)s AND %(to_date)s
+			GROUP BY article
+			ORDER BY issues DESC
+			LIMIT %(top)s
+		) r
+		LEFT JOIN `tabArticle` a ON a.name = r.article
+		ORDER BY r.issues DESC
+		""",
+		values,
+		as_dict=True,
+	)
+
+	daily = frappe.db.sql(
+		"""
+		SELECT date, SUM(issues) AS issues, SUM(returns) AS returns
+		FROM `tabArticle Circulation Daily`
+		WHERE date BETWEEN %(from_date)s AND %(to_date)s
+		GROUP BY date
+		ORDER BY date
+		""",
+		values,
+		as_dict=True,
+	)
+
+	active_members = frappe.db.sql(
+		"""
+		SELECT COUNT(DISTINCT library_member)
+		FROM `tabMember Circulation Monthly`
+		WHERE month BETWEEN %(from_month)s AND %(to_date)s
+		AND issues > 0
+		""",
+		values,
+	)[0][0]
+
+	# From the Article counters and the Allocated holds that set copies aside, not a scan of every copy
+	total, available = frappe.db.sql(
+		"SELECT IFNULL(SUM(total_copies), 0), IFNULL(SUM(available_copies), 0) FROM `tabArticle`"
+	)[0]
+	reserved = frappe.db.sql(
+		"SELECT COUNT(*) FROM `tabArticle Reservation` WHERE status = 'Allocated'"
+	)[0][0]
+
+	return {
+		"most_borrowed": most_borrowed,
+		"daily": daily,
+		"active_members": active_members,
+		"utilisation": {
+			"Available": int(available),
+			"Issued": int(total) - int(available) - reserved,
+			"Reserved": reserved,
+		},
+	}
@@ -0,0 +1,331 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Archival of closed loan history.
+
+Issue/Return pairs whose Return is older than `archive_after_days` are moved
+from `tabLibrary Transaction` into `tabLibrary Transaction Archive` in
+batches. Each batch copies and deletes in one database transaction, and the
+(date, name) keyset position is persisted after every batch so an
+interrupted run resumes where it stopped. Open loans are never moved, which
+keeps the hot table sized to recent activity. Moved rows are reported to the
+change feed as Library Transaction deletions, which are then served from the
+archive rather than the live table.
+"""
+
+import json
+
+import frappe
+from frappe.utils import add_days, now, today
+
+from library_management.changefeed import record_changes
+from library_management.settings import get_library_setting
+
+CHECKPOINT_KEY = "library_management_archive_checkpoint"
+
+# Upper bound on batches per scheduled run; the checkpoint carries the rest over
+MAX_BATCHES_PER_RUN = 200
+
+ARCHIVE_COLUMNS = (
+	"article",
+	"article_copy",
+	"library_member",
+	"date",
+	"type",
+	"issue_transaction",
+)
+
+
+def archive_closed_loans():
+	"""Scheduled entry point (daily_long)."""
+	horizon = add_days(today(), -get_library_setting("archive_after_days"))
+	batch_size = get_library_setting("archive_batch_size")
+
+	moved = 0
+	for _ in range(MAX_BATCHES_PER_RUN):
+		checkpoint = get_checkpoint()
+		issues = get_issue_batch(horizon, checkpoint, batch_size)
+		if not issues:
+			# Full pass done; the next run starts again from the oldest open loans
+			set_checkpoint(None)
+			frappe.db.commit()
+			break
+
+		names = pair_closed_loans(issues, horizon)
+		if names:
+			move_to_archive(names)
+			moved += len(names)
+
+		last = issues[-1]
+		set_checkpoint((str(last.date), last.name))
+		frappe.db.commit()
+
+	return moved
+
+
+def get_checkpoint():
+	value = frappe.db.get_global(CHECKPOINT_KEY)
+	return tuple(json.loads(value)) if value else None
+
+
+def set_checkpoint(value):
+	frappe.db.set_global(CHECKPOINT_KEY, json.dumps(value) if value else "")
+
+
+def get_issue_batch(horizon, checkpoint, batch_size):
+	"""Next Issue rows older than the horizon, in (date, name) keyset order."""
+	conditions = ""
+	values = {"horizon": horizon, "limit": batch_size}
+	if checkpoint:
+		conditions = "AND (date > %(date)s OR (date = %(date)s AND name > %(name)s))"
+		values.update(date=checkpoint[0], name=checkpoint[1])
+
+	return frappe.db.sql(
+		f"""
+		SELECT name, article, library_member, date
+		FROM `tabLibrary Transaction`
+		WHERE type = 'Issue'
+		AND docstatus = 1
+		AND date < %(horizon)s
+		{conditions}
+		ORDER BY date, name
+		LIMIT %(limit)s
+		""",
+		values,
+		as_dict=True,
+	)
+
+
+def pair_closed_loans(issues, horizon):
+	"""
+	Return the names of Issue rows and their Returns where the Return is also
+	older than the horizon. Returns recorded with `issue_transaction` pair
+	exactly; older Returns pair with the earliest unclaimed Return of the same
+	member and article on or after the Issue date.
+	"""
+	issue_names = [issue.name for issue in issues]
+	linked = frappe.db.sql(
+		"""
+		SELECT name, issue_transaction
+		FROM `tabLibrary Transaction`
+		WHERE issue_transaction IN %(issues)s
+		AND type = 'Return'
+		AND docstatus = 1
+		AND date < %(horizon)s
+		""",
+		{"issues": issue_names, "horizon": horizon},
+		as_dict=True,
+	)
+	return_for = {row.issue_transaction: row.name for row in linked}
+
+	unlinked = [issue for issue in issues if issue.name not in return_for]
+	if unlinked:
+		# Only Returns that can pair with this batch: same (member, article), not older than its Issues
+		pairs = sorted({(issue.library_member, issue.article) for issue in unlinked})
+		values = [value for pair in pairs for value in pair]
+		values.extend((min(issue.date for issue in unlinked), horizon))
+		legacy = frappe.db.sql(
+			f"""
+			SELECT name, library_member, article, date
+			FROM `tabLibrary Transaction`
+			WHERE (library_member, article) IN ({", ".join(["(%s, %s)"] * len(pairs))})
+			AND type = 'Return'
+			AND docstatus = 1
+			AND (issue_transaction IS NULL OR issue_transaction = '')
+			AND date >= %s
+			AND date < %s
+			ORDER BY date, creation
+			""",
+			values,
+			as_dict=True,
+		)
+		return_for.update(match_legacy_returns(unlinked, legacy))
+
+	names = []
+	for issue_name, return_name in return_for.items():
+		names.extend((issue_name, return_name))
+	return names
+
+
+def match_legacy_returns(issues, returns):
+	"""
+	{issue name: return name} for Returns recorded without `issue_transaction`.
+	Issues are taken in order and each claims the earliest unclaimed Return of
+	the same member and article on or after its date; `returns` must be in
+	(date, creation) order.
+	"""
+	return_for = {}
+	claimed = set()
+	for issue in issues:
+		for ret in returns:
+			if (
+				ret.name not in claimed
+				and ret.library_member == issue.library_member
+				and ret.article == issue.article
+				and ret.date >= issue.date
+			):
+				return_for[issue.name] = ret.name
+				claimed.add(ret.name)
+				break
+	return return_for
+
+
+def get_legacy_return(issue):
+	"""
+	Name of the Return recorded without `issue_transaction` that pairs with
+	`issue` (a row with name, library_member and article), else None. Pairs
+	the way archival does, across all of the member's unlinked Issues of the
+	article, so an earlier loan cannot borrow this loan's Return.
+	"""
+	values = {"member": issue.library_member, "article": issue.article}
+	returns = frappe.db.sql(
+		"""
+		SELECT name, library_member, article, date
+		FROM `tabLibrary Transaction`
+		WHERE library_member = %(member)s
+		AND article = %(article)s
+		AND type = 'Return'
+		AND docstatus = 1
+		AND (issue_transaction IS NULL OR issue_transaction = '')
+		ORDER BY date, creation
+		""",
+		values,
+		as_dict=True,
+	)
+	if not returns:
+		return None
+
+	issues = frappe.db.sql(
+		"""
+		SELECT i.name, i.library_member, i.article, i.date
+		FROM `tabLibrary Transaction` i
+		WHERE i.library_member = %(member)s
+		AND i.article = %(article)s
+		AND i.type = 'Issue'
+		AND i.docstatus = 1
+		AND NOT EXISTS (
+			SELECT 1 FROM `tabLibrary Transaction` r
+			WHERE r.issue_transaction = i.name AND r.docstatus = 1
+		)
+		ORDER BY i.date, i.creation
+		""",
+		values,
+		as_dict=True,
+	)
+	return match_legacy_returns(issues, returns).get(issue.name)
+
+
+def move_to_archive(names):
+	"""Copy rows into the archive and delete them from the hot table (one transaction)."""
+	columns = ", ".join(f"`{column}`" for column in ARCHIVE_COLUMNS)
+	frappe.db.sql(
+		f"""
+		INSERT IGNORE INTO `tabLibrary Transaction Archive`
+			(name, creation, modified, modified_by, owner, docstatus, idx, {columns}, transaction_creation)
+		SELECT name, %(now)s, %(now)s, 'Administrator', owner, 0, 0, {columns}, creation
+		FROM `tabLibrary Transaction`
+		WHERE name IN %(names)s
+		""",
+		{"names": names, "now": now()},
+	)
+	frappe.db.sql(
+		"DELETE FROM `tabLibrary Transaction` WHERE name IN %(names)s",
+		{"names": names},
+	)
+	# Same transaction as the DELETE: mirrors see a tombstone for every moved row
+	record_changes("Library Transaction", names, action="Delete")
+
+
+def get_member_history(library_member, cursor=None, limit=50, txn_type=None, article=None):
+	"""
+	One page of a member's history, hot and archived, newest first, in
+	(date, creation, name) keyset order. `cursor` is the `next_cursor` of the
+	previous page. Each side is read through its covering
+	(library_member, date, creation, ...) index and limited before the merge,
+	so a page costs the same however long the history is.
+	Returns (rows, next_cursor); next_cursor is None on the last page.
+	"""
+	conditions = ""
+	values = {"member": library_member, "limit": limit + 1}
+	if txn_type:
+		conditions += " AND type = %(type)s"
+		values["type"] = txn_type
+	if article:
+		conditions += " AND article = %(article)s"
+		values["article"] = article
+
+	hot_position = archived_position = ""
+	if cursor:
+		date, creation, name = read_cursor(cursor)
+		values.update(date=date, creation=creation, name=name)
+		position = """
+			AND (date < %(date)s OR (date = %(date)s AND ({creation} < %(creation)s
+				OR ({creation} = %(creation)s AND name < %(name)s))))
+		"""
+		hot_position = position.format(creation="creation")
+		archived_position = position.format(creation="transaction_creation")
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT h.name, h.article, a.section_break_wvtm AS title, h.type, h.date, h.creation,
+			h.docstatus, h.archived
+		FROM (
+			(
+				SELECT name, article, type, date, creation, docstatus, 0 AS archived
+				FROM `tabLibrary Transaction`
+				WHERE library_member = %(member)s {conditions} {hot_position}
+				ORDER BY date DESC, creation DESC, name DESC
+				LIMIT %(limit)s
+			)
+			UNION ALL
+			(
+				SELECT name, article, type, date, transaction_creation AS creation, 1 AS docstatus, 1 AS archived
+				FROM `tabLibrary Transaction Archive`
+				WHERE library_member = %(member)s {conditions} {archived_position}
+				ORDER BY date DESC, transaction_creation DESC, name DESC
+				LIMIT %(limit)s
+			)
+		) h
+		LEFT JOIN `tabArticle` a ON a.name = h.article
+		ORDER BY h.date DESC, h.creation DESC, h.name DESC
+		LIMIT %(limit)s
+		""",
+		values,
+		as_dict=True,
+	)
+
+	next_cursor = None
+	if len(rows) > limit:
+		rows = rows[:limit]
+		next_cursor = make_cursor(rows[-1])
+	return rows, next_cursor
+
+
+def make_cursor(row):
+	"""Opaque position after `row` in (date, creation, name) order."""
+	return json.dumps([str(row.date), str(row.creation), row.name])
+
+
+def read_cursor(cursor):
+	"""(date, creation, name) of a cursor from make_cursor."""
+	date, creation, name = json.loads(cursor)
+	return date, creation, name
+
+
+def get_member_transactions(library_member):
+	"""A member's full transaction history, hot and archived, newest first."""
+	return frappe.db.sql(
+		"""
+		SELECT name, article, library_member, type, date, docstatus, 0 AS archived
+		FROM `tabLibrary Transaction`
+		WHERE library_member = %(member)s
+		UNION ALL
+		SELECT name, article, library_member, type, date, 1 AS docstatus, 1 AS archived
+		FROM `tabLibrary Transaction Archive`
+		WHERE library_member = %(member)s
+		ORDER BY date DESC
+		""",
+		{"member": library_member},
+		as_dict=True,
+	)
@@ -0,0 +1,104 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Branch dimension for circulation.
+
+Every Article Copy belongs to a Library Branch, and every Library Transaction
+records the branch of the copy it moved. Rentals and listings are scoped to
+the request's branch, so one desk's rentals lock copies only in its own
+branch, through the branch-leading Article Copy index. A member's loan limit
+counts their loans at every branch.
+
+The request's branch is resolved in this order:
+- an explicit `branch` argument or form value;
+- the `X-Library-Branch` header;
+- the user's `library_branch` default;
+- the default branch.
+
+Installs without branches resolve to None, which leaves everything unscoped.
+`loan_period` and `max_articles_per_user` can be overridden per branch and
+fall back to Library Settings.
+"""
+
+import frappe
+
+from library_management.catalogue import LISTING_COLUMNS, format_listing_row
+from library_management.settings import get_library_setting
+
+DEFAULT_BRANCH_KEY = "library_management:default_branch"
+
+# Library Settings fields a branch may override
+BRANCH_SETTINGS = ("loan_period", "max_articles_per_user")
+
+
+def get_current_branch(branch=None):
+	branch = (
+		branch
+		or frappe.form_dict.get("branch")
+		or frappe.get_request_header("X-Library-Branch")
+		or frappe.defaults.get_user_default("library_branch")
+	)
+	if branch:
+		return branch
+	return get_default_branch()
+
+
+def get_default_branch():
+	branch = frappe.cache().get_value(DEFAULT_BRANCH_KEY)
+	if branch is None:
+		branch = frappe.db.get_value("Library Branch", {"is_default": 1, "disabled": 0}, "name") or ""
+		frappe.cache().set_value(DEFAULT_BRANCH_KEY, branch)
+	return branch or None
+
+
+def clear_cache(doc=None, method=None):
+	"""Library Branch on_update and after_delete."""
+	frappe.cache().delete_value(DEFAULT_BRANCH_KEY)
+
+
+def get_branch_setting(fieldname, branch=None):
+	"""A per-branch override of a Library Settings value, else the library-wide value."""
+	value = None
+	if branch and fieldname in BRANCH_SETTINGS:
+		value = frappe.get_cached_value("Library Branch", branch, fieldname)
+	return value or get_library_setting(fieldname)
+
+
+def set_copy_branch(doc, method=None):
+	"""Article Copy validate: copies added without a branch go to the default one."""
+	if not doc.branch:
+		doc.branch = get_default_branch()
+
+
+def get_branch_listing(branch):
+	"""get_articles rows for the articles with copies at `branch`, with that branch's counters."""
+	counters = frappe.db.sql(
+		"""
+		SELECT article, COUNT(*), SUM(status = 'Available'), SUM(status = 'Reserved')
+		FROM `tabArticle Copy`
+		WHERE branch = %s
+		GROUP BY article
+		""",
+		(branch,),
+	)
+	if not counters:
+		return []
+
+	by_article = {row[0]: row[1:] for row in counters}
+	articles = frappe.db.sql(
+		f"""
+		SELECT {LISTING_COLUMNS}
+		FROM `tabArticle`
+		WHERE name IN %(names)s
+		ORDER BY creation DESC
+		""",
+		{"names": list(by_article)},
+		as_dict=True,
+	)
+	for article in articles:
+		total, available, reserved = by_article[article.name]
+		article.total_copies = total
+		article.available_copies = int(available)
+		article.status = "Available" if available else ("Reserved" if reserved else "Issued")
+	return [format_listing_row(article) for article in articles]
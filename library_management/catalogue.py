@@ -0,0 +1,138 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Derived catalogue fields kept on the Article row.
+
+`description_preview` is the description with HTML stripped, whitespace
+collapsed and cut at a word boundary. It is computed once on save so listing
+queries can select the short column instead of the full Text Editor HTML.
+
+`isbn_normalized` is the ISBN as a validated ISBN-13 (ISBN-10 input is
+converted), which is also the EAN-13 printed on the book's barcode. It has a
+unique index, so a desk scan resolves to one Article with one lookup.
+"""
+
+import re
+from html import unescape
+
+import frappe
+from frappe import _
+from frappe.utils import formatdate, strip_html_tags
+
+from library_management.thumbnails import get_srcset, get_thumbnail_urls
+
+PREVIEW_LENGTH = 150
+
+# Tags that separate words when rendered; stripping them outright would join "end.</p><p>Next"
+BLOCK_TAGS = re.compile(r"</?(?:p|div|br|li|ul|ol|h[1-6]|tr|td|th|blockquote|pre)\b[^>]*>", re.IGNORECASE)
+
+# Columns behind one catalogue listing entry; see format_listing_row
+LISTING_COLUMNS = """
+	name,
+	section_break_wvtm as title,
+	author,
+	description_preview,
+	status,
+	total_copies,
+	available_copies,
+	creation,
+	publisher,
+	isbn,
+	route,
+	attach_image_pfdz as image,
+	image_hash
+"""
+
+
+def set_description_preview(doc, method=None):
+	"""Article validate."""
+	doc.description_preview = make_preview(doc.description)
+
+
+def make_preview(html, length=PREVIEW_LENGTH):
+	if not html:
+		return None
+
+	text = re.sub(r"\s+", " ", unescape(strip_html_tags(BLOCK_TAGS.sub(" ", html)))).strip()
+	if len(text) <= length:
+		return text
+
+	cut = text[:length]
+	# Back up to the last space so a word is never split, unless that loses too much
+	space = cut.rfind(" ")
+	if space > length // 2:
+		cut = cut[:space]
+	return cut.rstrip(" ,.;:-") + "..."
+
+
+def set_isbn_normalized(doc, method=None):
+	"""
+	Article validate. Only runs when the ISBN changes, so legacy duplicates that
+	the backfill left without `isbn_normalized` can still be edited.
+	"""
+	if not doc.has_value_changed("isbn"):
+		return
+
+	normalized = normalize_isbn(doc.isbn)
+	if doc.isbn and not normalized:
+		frappe.throw(_("{0} is not a valid ISBN-10 or ISBN-13").format(doc.isbn))
+
+	if normalized:
+		duplicate = frappe.db.get_value(
+			"Article", {"isbn_normalized": normalized, "name": ["!=", doc.name]}, "name"
+		)
+		if duplicate:
+			frappe.throw(
+				_("Article {0} already has ISBN {1}. Add a copy to it instead.").format(duplicate, normalized)
+			)
+	doc.isbn_normalized = normalized
+
+
+def normalize_isbn(value):
+	"""Validated ISBN-13 for an ISBN-10/13 in any common notation, else None."""
+	if not value:
+		return None
+
+	isbn = re.sub(r"[\s-]", "", str(value)).upper()
+	if re.fullmatch(r"\d{9}[\dX]", isbn):
+		if isbn10_check_digit(isbn[:9]) != isbn[9]:
+			return None
+		body = "978" + isbn[:9]
+		return body + isbn13_check_digit(body)
+
+	if re.fullmatch(r"97[89]\d{10}", isbn) and isbn13_check_digit(isbn[:12]) == isbn[12]:
+		return isbn
+	return None
+
+
+def isbn10_check_digit(body):
+	check = (11 - sum((10 - i) * int(digit) for i, digit in enumerate(body)) % 11) % 11
+	return "X" if check == 10 else str(check)
+
+
+def isbn13_check_digit(body):
+	return str((10 - sum((3 if i % 2 else 1) * int(digit) for i, digit in enumerate(body)) % 10) % 10)
+
+
+def format_listing_row(article):
+	"""Public listing entry for a row selected with LISTING_COLUMNS (get_articles, catalogue snapshot)."""
+	return {
+		"name": article.name,
+		"title": article.title or article.name,
+		"author": article.author,
+		"status": article.status,
+		"total_copies": article.total_copies,
+		"available_copies": article.available_copies,
+		"creation": article.creation,
+		"publisher": article.publisher,
+		"isbn": article.isbn,
+		"route": article.route,
+		"image": article.image,
+		# Small WebP variants for the cards; falls back to the original until generated
+		"thumbnail": get_thumbnail_urls(article.image_hash).get(320) or article.image,
+		"thumbnail_srcset": get_srcset(article.image_hash),
+		"formatted_date": formatdate(article.creation),
+		# Stored plain-text teaser; the full description is only served by get_article_details
+		"description_preview": article.description_preview,
+	}
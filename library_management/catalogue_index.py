@@ -0,0 +1,285 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Optional in-worker columnar catalogue index.
+
+With `"catalogue_index": 1` in site_config, each worker process keeps the
+catalogue's filter and sort keys in NumPy arrays: interned author and
+publisher ids (int32), a status byte (uint8), creation timestamps (int64),
+a title sort rank (int32) and a liveness mask. Filter, sort and count
+queries then run as vectorised array operations instead of SQL.
+
+The index is loaded on first use and refreshed at most every
+REFRESH_SECONDS from the change feed: only Articles with entries after the
+index's sequence number are re-read. The change feed is used instead of
+`modified` because rentals and returns update the counters with raw SQL
+that does not touch `modified`; it also records deletions.
+
+Memory is about 24 MB per 100k articles (measured with `estimate_memory`,
+names and titles of typical length); the arrays themselves are 2.2 MB and
+the rest is the Python strings and the name lookup. A worker whose index
+would exceed `catalogue_index_max_mb` (default 64) drops it and falls back
+to SQL.
+"""
+
+import sys
+import threading
+import time
+
+import frappe
+
+from library_management.changefeed import get_head_seq
+
+STATUS_CODES = {"Available": 0, "Issued": 1, "Reserved": 2}
+OTHER_STATUS = 3
+REFRESH_SECONDS = 2
+DEFAULT_MAX_MB = 64
+SORT_FIELDS = ("creation", "title")
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class Interner:
+	"""Maps strings to dense int ids; id 0 is reserved for empty values."""
+
+	def __init__(self):
+		self.ids = {}
+
+	def get_id(self, value):
+		key = (value or "").strip().casefold()
+		if not key:
+			return 0
+		return self.ids.setdefault(key, len(self.ids) + 1)
+
+	def lookup(self, value):
+		return self.ids.get((value or "").strip().casefold())
+
+
+class CatalogueIndex:
+	def __init__(self):
+		import numpy as np
+
+		self.np = np
+		self.seq = 0
+		self.checked_at = 0
+		self.names = []
+		self.titles = []
+		self.position = {}
+		self.authors = Interner()
+		self.publishers = Interner()
+		self.author_ids = np.zeros(0, dtype=np.int32)
+		self.publisher_ids = np.zeros(0, dtype=np.int32)
+		self.status = np.zeros(0, dtype=np.uint8)
+		self.creation = np.zeros(0, dtype=np.int64)
+		self.alive = np.zeros(0, dtype=bool)
+		self.title_rank = np.zeros(0, dtype=np.int32)
+
+	def apply(self, rows, deleted=()):
+		"""Upsert (name, title, author, publisher, status, creation) rows and drop deleted names."""
+		np = self.np
+		new = []
+		retitled = False
+		for row in rows:
+			name, title, author, publisher, status, creation = row
+			i = self.position.get(name)
+			if i is None:
+				new.append(row)
+				continue
+			if self.titles[i] != (title or name):
+				self.titles[i] = title or name
+				retitled = True
+			self.author_ids[i] = self.authors.get_id(author)
+			self.publisher_ids[i] = self.publishers.get_id(publisher)
+			self.status[i] = STATUS_CODES.get(status, OTHER_STATUS)
+			self.creation[i] = timestamp(creation)
+			self.alive[i] = True
+
+		for name in deleted:
+			i = self.position.get(name)
+			if i is not None:
+				self.alive[i] = False
+
+		if new:
+			start = len(self.names)
+			for offset, (name, title, *_) in enumerate(new):
+				self.position[name] = start + offset
+				self.names.append(name)
+				self.titles.append(title or name)
+			self.author_ids = np.concatenate(
+				(self.author_ids, np.array([self.authors.get_id(r[2]) for r in new], dtype=np.int32))
+			)
+			self.publisher_ids = np.concatenate(
+				(self.publisher_ids, np.array([self.publishers.get_id(r[3]) for r in new], dtype=np.int32))
+			)
+			self.status = np.concatenate(
+				(self.status, np.array([STATUS_CODES.get(r[4], OTHER_STATUS) for r in new], dtype=np.uint8))
+			)
+			self.creation = np.concatenate(
+				(self.creation, np.array([timestamp(r[5]) for r in new], dtype=np.int64))
+			)
+			self.alive = np.concatenate((self.alive, np.ones(len(new), dtype=bool)))
+
+		# Rentals and returns only change status, so most refreshes skip the re-sort
+		if new or retitled:
+			# Rank of each title in case-insensitive order, so title sorts are integer sorts
+			order = np.argsort(np.array([title.casefold() for title in self.titles]), kind="stable")
+			self.title_rank = np.empty(len(order), dtype=np.int32)
+			self.title_rank[order] = np.arange(len(order), dtype=np.int32)
+
+	def query(
+		self, status=None, author=None, publisher=None, sort="creation", descending=True, start=0, limit=20
+	):
+		"""(matching count, names of the requested page)."""
+		np = self.np
+		mask = self.alive.copy()
+		if status:
+			mask &= self.status == STATUS_CODES.get(status, OTHER_STATUS)
+		for value, interner, ids in (
+			(author, self.authors, self.author_ids),
+			(publisher, self.publishers, self.publisher_ids),
+		):
+			if value:
+				value_id = interner.lookup(value)
+				if value_id is None:
+					return 0, []
+				mask &= ids == value_id
+
+		matches = np.flatnonzero(mask)
+		keys = (self.title_rank if sort == "title" else self.creation)[matches]
+		order = np.argsort(keys, kind="stable")
+		if descending:
+			order = order[::-1]
+		return len(matches), [self.names[i] for i in matches[order[start : start + limit]]]
+
+	def status_counts(self):
+		counts = self.np.bincount(self.status[self.alive], minlength=OTHER_STATUS + 1)
+		return {status: int(counts[code]) for status, code in STATUS_CODES.items()}
+
+	def memory_usage(self):
+		"""Approximate bytes held by this index."""
+		arrays = (
+			self.author_ids,
+			self.publisher_ids,
+			self.status,
+			self.creation,
+			self.alive,
+			self.title_rank,
+		)
+		strings = sum(sys.getsizeof(value) for value in self.names) + sum(
+			sys.getsizeof(value) for value in self.titles
+		)
+		containers = sys.getsizeof(self.names) + sys.getsizeof(self.titles) + sys.getsizeof(self.position)
+		interned = sum(sys.getsizeof(key) for key in self.authors.ids) + sum(
+			sys.getsizeof(key) for key in self.publishers.ids
+		)
+		return sum(array.nbytes for array in arrays) + strings + containers + interned
+
+
+def timestamp(value):
+	return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def get_index():
+	"""This worker's index for the current site, refreshed if due; None when disabled."""
+	if not frappe.conf.catalogue_index:
+		return None
+
+	site = frappe.local.site
+	with _lock:
+		index = _indexes.get(site)
+		if index is False:
+			return None
+		if index is None:
+			index = _indexes[site] = CatalogueIndex()
+		if time.monotonic() - index.checked_at >= REFRESH_SECONDS:
+			refresh(index)
+			if index.memory_usage() > (frappe.conf.catalogue_index_max_mb or DEFAULT_MAX_MB) * 1024 * 1024:
+				frappe.log_error("Catalogue index exceeds catalogue_index_max_mb; using SQL instead")
+				_indexes[site] = False
+				return None
+	return index
+
+
+def refresh(index):
+	head = get_head_seq(max(index.seq, 0))
+	index.checked_at = time.monotonic()
+
+	if not index.seq:
+		index.apply(fetch_rows())
+	elif head > index.seq:
+		changed = frappe.db.sql_list(
+			"""
+			SELECT DISTINCT reference_name
+			FROM `tabLibrary Change`
+			WHERE reference_doctype = 'Article'
+			AND name > %s AND name <= %s
+			""",
+			(index.seq, head),
+		)
+		if changed:
+			rows = fetch_rows(changed)
+			found = {row[0] for row in rows}
+			index.apply(rows, deleted=[name for name in changed if name not in found])
+	index.seq = head or -1
+
+
+def fetch_rows(names=None):
+	condition = "WHERE name IN %(names)s" if names else ""
+	return frappe.db.sql(
+		f"""
+		SELECT name, section_break_wvtm, author, publisher, status, creation
+		FROM `tabArticle`
+		{condition}
+		ORDER BY creation, name
+		""",
+		{"names": names},
+	)
+
+
+def query_sql(status=None, author=None, publisher=None, sort="creation", descending=True, start=0, limit=20):
+	"""Same contract as CatalogueIndex.query, answered by the database."""
+	conditions, values = [], {"start": start, "limit": limit}
+	for field, value in (("status", status), ("author", author), ("publisher", publisher)):
+		if value:
+			conditions.append(f"{field} = %({field})s")
+			values[field] = value
+	where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+	order = "section_break_wvtm" if sort == "title" else "creation"
+	direction = "DESC" if descending else "ASC"
+
+	total = frappe.db.sql(f"SELECT COUNT(*) FROM `tabArticle` {where}", values)[0][0]
+	names = frappe.db.sql_list(
+		f"SELECT name FROM `tabArticle` {where} ORDER BY {order} {direction} LIMIT %(start)s, %(limit)s",
+		values,
+	)
+	return total, names
+
+
+def status_counts_sql():
+	counts = dict(frappe.db.sql("SELECT status, COUNT(*) FROM `tabArticle` GROUP BY status"))
+	return {status: counts.get(status, 0) for status in STATUS_CODES}
+
+
+def estimate_memory(n=100_000):
+	"""Bytes used by an index of `n` synthetic articles (no database needed)."""
+	from datetime import datetime, timedelta
+
+	index = CatalogueIndex()
+	base = datetime(2020, 1, 1)
+	statuses = list(STATUS_CODES)
+	index.apply(
+		[
+			(
+				f"ART-{i:07d}",
+				f"Article title number {i} about subject {i % 977}",
+				f"Author {i % 20000}",
+				f"Publisher {i % 800}",
+				statuses[i % 3],
+				base + timedelta(minutes=i),
+			)
+			for i in range(n)
+		]
+	)
+	return index.memory_usage()
@@ -0,0 +1,220 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Change feed for external mirrors.
+
+Every insert, update and delete of a tracked DocType appends a row to
+`Library Change` in the same database transaction as the change itself. The
+auto-increment name of that row is the sequence number: consumers remember
+the last one they processed and call `changes_since` to get everything after
+it, so a sync costs O(changes) rather than a full catalogue pull.
+
+Compaction drops entries older than `change_feed_retention_days` that were
+superseded by a later entry for the same document. The latest entry of every
+document (including Delete tombstones) is always kept, so a consumer that
+starts from sequence 0 still ends up with a complete mirror.
+
+Sequence numbers are taken at insert time but become visible at commit, so a
+reader can see 11 before 10 exists. The feed is therefore only served up to
+the first missing number; a gap is skipped once the entry after it is older
+than GAP_TIMEOUT, by which point the transaction that took the number has
+rolled back (or the entry was compacted away).
+"""
+
+import frappe
+from frappe.utils import add_days, add_to_date, now, now_datetime
+
+from library_management.settings import get_library_setting
+
+CHANGE_LOG = "Library Change"
+
+# Fields returned with each change, read from the live record in one query per DocType
+TRACKED_FIELDS = {
+	"Article": [
+		"name",
+		"section_break_wvtm AS title",
+		"author",
+		"isbn",
+		"publisher",
+		"status",
+		"published",
+		"total_copies",
+		"available_copies",
+		"modified",
+	],
+	"Library Transaction": [
+		"name",
+		"article",
+		"article_copy",
+		"library_member",
+		"type",
+		"date",
+		"issue_transaction",
+		"docstatus",
+		"modified",
+	],
+	"Library Membership": ["name", "library_member", "from_date", "to_date", "modified"],
+}
+
+# How long a missing sequence number holds the feed back before it is taken as rolled back
+GAP_TIMEOUT = 300
+GAP_SCAN_BATCH = 1000
+
+COMPACT_BATCH_SIZE = 10000
+
+
+def on_change(doc, method=None):
+	"""on_change / after_delete of every tracked DocType."""
+	if method == "after_delete":
+		action = "Delete"
+	elif doc.flags.in_insert:
+		action = "Insert"
+	else:
+		action = "Update"
+	record_change(doc.doctype, doc.name, action)
+
+
+def record_change(doctype, name, action="Update"):
+	"""Append one entry; also used by code paths that update rows with raw SQL."""
+	timestamp = now()
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabLibrary Change`
+			(creation, modified, modified_by, owner, docstatus, idx, reference_doctype, reference_name, action)
+		VALUES (%(now)s, %(now)s, %(user)s, %(user)s, 0, 0, %(doctype)s, %(name)s, %(action)s)
+		""",
+		{"now": timestamp, "user": frappe.session.user, "doctype": doctype, "name": name, "action": action},
+	)
+
+
+def record_changes(doctype, names, action="Insert"):
+	"""Bulk variant of record_change for set-based writers; one multi-row INSERT."""
+	if not names:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		CHANGE_LOG,
+		fields=[
+			"creation",
+			"modified",
+			"modified_by",
+			"owner",
+			"reference_doctype",
+			"reference_name",
+			"action",
+		],
+		values=[(timestamp, timestamp, user, user, doctype, name, action) for name in names],
+	)
+
+
+def get_changes_since(seq, limit=500):
+	"""
+	Entries with a sequence number above `seq`, oldest first, each carrying the
+	current state of its document (None once the document is deleted).
+	"""
+	changes = frappe.db.sql(
+		"""
+		SELECT name AS seq, reference_doctype AS doctype, reference_name AS docname, action, creation
+		FROM `tabLibrary Change`
+		WHERE name > %(seq)s
+		ORDER BY name
+		LIMIT %(limit)s
+		""",
+		{"seq": seq, "limit": limit},
+		as_dict=True,
+	)
+	changes = settled_prefix(changes, int(seq))
+
+	wanted = {}
+	for change in changes:
+		wanted.setdefault(change.doctype, set()).add(change.docname)
+
+	current = {}
+	for doctype, names in wanted.items():
+		for row in frappe.get_all(
+			doctype, filters={"name": ["in", list(names)]}, fields=TRACKED_FIELDS[doctype]
+		):
+			current[(doctype, row.name)] = row
+
+	for change in changes:
+		change.pop("creation")
+		change["data"] = current.get((change.doctype, change.docname))
+
+	return changes
+
+
+def get_head_seq(after=0):
+	"""
+	Highest sequence number (at least `after`) below which nothing is still
+	pending, for readers that process the feed as a range rather than entry
+	by entry. Only the tail of the log is read: a gap followed by an entry
+	older than GAP_TIMEOUT is already settled.
+	"""
+	cutoff = add_to_date(now_datetime(), seconds=-GAP_TIMEOUT)
+	tail = []
+	before = None
+	while True:
+		batch = frappe.db.sql(
+			f"""
+			SELECT name AS seq, creation
+			FROM `tabLibrary Change`
+			WHERE name > %(after)s {"AND name < %(before)s" if before else ""}
+			ORDER BY name DESC
+			LIMIT %(limit)s
+			""",
+			{"after": after, "before": before, "limit": GAP_SCAN_BATCH},
+			as_dict=True,
+		)
+		tail.extend(batch)
+		if len(batch) < GAP_SCAN_BATCH or batch[-1].creation <= cutoff:
+			break
+		before = batch[-1].seq
+
+	settled = settled_prefix(tail[::-1], int(after), cutoff)
+	return settled[-1].seq if settled else after
+
+
+def settled_prefix(entries, after, cutoff=None):
+	"""The entries (ordered by seq) before the first missing sequence number that may still commit."""
+	cutoff = cutoff or add_to_date(now_datetime(), seconds=-GAP_TIMEOUT)
+	expected = after + 1
+	for i, entry in enumerate(entries):
+		if entry.seq > expected and entry.creation > cutoff:
+			return entries[:i]
+		expected = entry.seq + 1
+	return entries
+
+
+def compact_change_log():
+	"""Scheduled entry point (daily_long)."""
+	horizon = add_days(now(), -get_library_setting("change_feed_retention_days"))
+	last_seq = frappe.db.sql(
+		"SELECT MAX(name) FROM `tabLibrary Change` WHERE creation < %s",
+		(horizon,),
+	)[0][0]
+	if not last_seq:
+		return
+
+	start = frappe.db.sql("SELECT MIN(name) FROM `tabLibrary Change`")[0][0]
+	while start <= last_seq:
+		stop = min(start + COMPACT_BATCH_SIZE, last_seq + 1)
+		# One sequence range per commit keeps row locks short on the append path
+		frappe.db.sql(
+			"""
+			DELETE older
+			FROM `tabLibrary Change` older
+			INNER JOIN `tabLibrary Change` newer
+				ON newer.reference_doctype = older.reference_doctype
+				AND newer.reference_name = older.reference_name
+				AND newer.name > older.name
+			WHERE older.name >= %(start)s
+			AND older.name < %(stop)s
+			AND older.creation < %(horizon)s
+			""",
+			{"start": start, "stop": stop, "horizon": horizon},
+		)
+		frappe.db.commit()
+		start = stop
@@ -0,0 +1,30 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("enrol-members")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--renew", is_flag=True, default=False, help="Also renew memberships ending within 30 days")
+@click.option("--days", type=int, default=365, help="Length of each new membership in days")
+@pass_context
+def enrol_members(context, csv_path, renew, days):
+	"""Enrol or renew members listed in a CSV file (email, first_name, last_name)."""
+	import frappe
+
+	from library_management.enrolment import enrol_from_csv
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		totals = enrol_from_csv(csv_path, renew=renew, days=days)
+	finally:
+		frappe.destroy()
+
+	click.echo(", ".join(f"{key.replace('_', ' ')}: {value}" for key, value in totals.items()))
+
+
+commands = [enrol_members]
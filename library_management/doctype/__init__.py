@@ -4,3 +4,13 @@ from . import library_member
 from . import library_membership
 from . import library_settings
 from . import library_transaction
+from . import article_copy
+from . import article_reservation
+from . import library_transaction_archive
+from . import article_circulation_daily
+from . import member_circulation_monthly
+from . import article_recommendation
+from . import library_change
+from . import isbn_metadata
+from . import api_profile
+from . import library_branch
@@ -0,0 +1,2 @@
+# API Profile DocType module
+from .api_profile import APIProfile
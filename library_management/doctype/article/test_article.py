@@ -2,7 +2,9 @@
 # See license.txt
 
 # import frappe
-from frappe.tests import IntegrationTestCase
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from library_management.catalogue import PREVIEW_LENGTH, make_preview, normalize_isbn
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -12,6 +14,54 @@ EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
 
+class UnitTestArticle(UnitTestCase):
+	"""
+	Unit tests for Article.
+	Use this class for testing individual functions and methods.
+	"""
+
+	def test_preview_of_empty_description(self):
+		self.assertIsNone(make_preview(None))
+		self.assertIsNone(make_preview(""))
+
+	def test_preview_keeps_words_apart_across_block_tags(self):
+		self.assertEqual(
+			make_preview("<p>First paragraph.</p><p>Second&nbsp;one</p><ul><li>a</li><li>b</li></ul>"),
+			"First paragraph. Second one a b",
+		)
+		self.assertEqual(make_preview("Line<br>break<BR/>again"), "Line break again")
+
+	def test_preview_does_not_split_words_at_inline_tags(self):
+		self.assertEqual(make_preview("Un<em>believ</em>able <b>story</b>"), "Unbelievable story")
+
+	def test_preview_is_cut_at_a_word_boundary(self):
+		preview = make_preview("word " * 50)
+		self.assertTrue(preview.endswith("..."))
+		self.assertLessEqual(len(preview), PREVIEW_LENGTH + 3)
+		self.assertEqual(set(preview[:-3].split(" ")), {"word"})
+
+	def test_preview_cuts_a_single_long_word(self):
+		self.assertEqual(make_preview("x" * 200), "x" * PREVIEW_LENGTH + "...")
+
+	def test_isbn13_in_any_notation(self):
+		for value in ("9780306406157", "978-0-306-40615-7", " 978 0 306 40615 7 "):
+			self.assertEqual(normalize_isbn(value), "9780306406157")
+		self.assertEqual(normalize_isbn("979-10-90636-07-1"), "9791090636071")
+
+	def test_isbn10_is_converted_to_isbn13(self):
+		self.assertEqual(normalize_isbn("0-306-40615-2"), "9780306406157")
+		# X check digit, in either case
+		self.assertEqual(normalize_isbn("0-8044-2957-X"), "9780804429573")
+		self.assertEqual(normalize_isbn("080442957x"), "9780804429573")
+
+	def test_isbn_with_wrong_check_digit(self):
+		self.assertIsNone(normalize_isbn("9780306406158"))
+		self.assertIsNone(normalize_isbn("0306406153"))
+
+	def test_values_that_are_not_isbns(self):
+		for value in (None, "", "abc", "030640615", "97803064061577", "9770306406157"):
+			self.assertIsNone(normalize_isbn(value))
+
 
 class IntegrationTestArticle(IntegrationTestCase):
 	"""
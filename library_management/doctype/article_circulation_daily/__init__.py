@@ -0,0 +1,2 @@
+# Article Circulation Daily DocType module
+from .article_circulation_daily import ArticleCirculationDaily
@@ -0,0 +1,2 @@
+# Article Copy DocType module
+from .article_copy import ArticleCopy
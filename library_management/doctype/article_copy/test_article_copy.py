@@ -0,0 +1,54 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from library_management.inventory import add_copies, claim_copy
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+
+class IntegrationTestArticleCopy(IntegrationTestCase):
+	"""
+	Integration tests for ArticleCopy.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def setUp(self):
+		# Every new Article starts with one copy
+		self.article = frappe.get_doc({"doctype": "Article", "section_break_wvtm": "Copy claim test"}).insert(
+			ignore_permissions=True
+		).name
+		add_copies(self.article, 2)
+		self.copies = frappe.get_all(
+			"Article Copy", filters={"article": self.article}, pluck="name", order_by="name"
+		)
+
+	def test_claim_takes_the_preferred_copy_when_it_is_free(self):
+		self.assertEqual(claim_copy(self.article, preferred=self.copies[1]), self.copies[1])
+		self.assertEqual(frappe.db.get_value("Article Copy", self.copies[1], "status"), "Issued")
+
+		# Once it is out, preferring it again falls back to another free copy
+		self.assertIn(claim_copy(self.article, preferred=self.copies[1]), (self.copies[0], self.copies[2]))
+
+	def test_claim_stays_within_the_branch(self):
+		branch = frappe.get_doc(
+			{"doctype": "Library Branch", "branch_name": f"Branch {frappe.generate_hash(length=6)}"}
+		).insert(ignore_permissions=True).name
+		frappe.db.set_value("Article Copy", self.copies[2], "branch", branch)
+
+		# A preferred copy held at another branch is passed over
+		self.assertEqual(claim_copy(self.article, preferred=self.copies[0], branch=branch), self.copies[2])
+		self.assertIsNone(claim_copy(self.article, branch=branch))
+
+	def test_claim_without_free_copies(self):
+		claimed = {claim_copy(self.article) for _ in self.copies}
+		self.assertEqual(claimed, set(self.copies))
+		self.assertIsNone(claim_copy(self.article))
@@ -0,0 +1,2 @@
+# Article Recommendation DocType module
+from .article_recommendation import ArticleRecommendation
@@ -0,0 +1,2 @@
+# Article Reservation DocType module
+from .article_reservation import ArticleReservation
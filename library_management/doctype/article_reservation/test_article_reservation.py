@@ -0,0 +1,103 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, add_to_date, now_datetime, today
+
+from library_management.reservations import allocate_next, queue_member
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestArticleReservation(UnitTestCase):
+	"""
+	Unit tests for ArticleReservation.
+	Use this class for testing individual functions and methods.
+	"""
+
+	def test_queue_member_orders_like_the_table(self):
+		base = datetime(2024, 5, 1, 9, 0)
+		holds = [
+			frappe._dict(name="RES-3", priority=0, requested_on=base),
+			frappe._dict(name="RES-1", priority=0, requested_on=base + timedelta(microseconds=1)),
+			frappe._dict(name="RES-2", priority=-5, requested_on=base + timedelta(days=1)),
+			frappe._dict(name="RES-4", priority=3, requested_on=base - timedelta(days=1)),
+			frappe._dict(name="RES-0", priority=None, requested_on=base),
+		]
+		# Sorted-set values compare bytewise; this must match ORDER BY priority, requested_on, name
+		ordered = sorted(holds, key=queue_member)
+		self.assertEqual([hold.name for hold in ordered], ["RES-2", "RES-0", "RES-3", "RES-1", "RES-4"])
+
+	def test_queue_member_is_stable_across_value_types(self):
+		# The same hold read back from the database (string datetime) must map to the same member
+		from_doc = frappe._dict(name="RES-1", priority=0, requested_on=datetime(2024, 5, 1, 9, 0))
+		from_db = frappe._dict(name="RES-1", priority=0, requested_on="2024-05-01 09:00:00")
+		self.assertEqual(queue_member(from_doc), queue_member(from_db))
+
+
+class IntegrationTestArticleReservation(IntegrationTestCase):
+	"""
+	Integration tests for ArticleReservation.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def setUp(self):
+		# Every new Article starts with one copy
+		self.article = frappe.get_doc({"doctype": "Article", "section_break_wvtm": "Hold queue test"}).insert(
+			ignore_permissions=True
+		).name
+		self.copy = frappe.db.get_value("Article Copy", {"article": self.article}, "name")
+
+	def make_member(self, first_name, active=True):
+		member = frappe.get_doc({
+			"doctype": "Library Member",
+			"first_name": first_name,
+			"email": f"{frappe.generate_hash(length=10)}@example.com",
+		}).insert(ignore_permissions=True).name
+		if active:
+			frappe.get_doc({
+				"doctype": "Library Membership",
+				"library_member": member,
+				"from_date": add_days(today(), -1),
+				"to_date": add_days(today(), 30),
+			}).insert(ignore_permissions=True)
+		return member
+
+	def make_hold(self, member, priority=0, minutes_ago=0):
+		return frappe.get_doc({
+			"doctype": "Article Reservation",
+			"article": self.article,
+			"library_member": member,
+			"priority": priority,
+			"requested_on": add_to_date(now_datetime(), minutes=-minutes_ago),
+			"status": "Waiting",
+		}).insert(ignore_permissions=True).name
+
+	def test_allocation_follows_priority_then_request_time(self):
+		early = self.make_hold(self.make_member("Early"), minutes_ago=10)
+		urgent = self.make_hold(self.make_member("Urgent"), priority=-1)
+
+		self.assertEqual(allocate_next(self.article, self.copy), urgent)
+		hold = frappe.db.get_value("Article Reservation", urgent, ["status", "article_copy"], as_dict=True)
+		self.assertEqual((hold.status, hold.article_copy), ("Allocated", self.copy))
+		self.assertEqual(frappe.db.get_value("Article Copy", self.copy, "status"), "Reserved")
+		self.assertEqual(frappe.db.get_value("Article Reservation", early, "status"), "Waiting")
+
+	def test_allocation_passes_over_members_without_membership(self):
+		lapsed = self.make_hold(self.make_member("Lapsed", active=False), minutes_ago=10)
+		active = self.make_hold(self.make_member("Active"))
+
+		self.assertEqual(allocate_next(self.article, self.copy), active)
+		# Passed over, not dropped: the hold keeps its place for the next copy
+		self.assertEqual(frappe.db.get_value("Article Reservation", lapsed, "status"), "Waiting")
+
+	def test_allocation_without_waiting_holds(self):
+		self.assertIsNone(allocate_next(self.article, self.copy))
@@ -0,0 +1,2 @@
+# ISBN Metadata DocType module
+from .isbn_metadata import ISBNMetadata
@@ -0,0 +1,2 @@
+# Library Branch DocType module
+from .library_branch import LibraryBranch
@@ -0,0 +1,2 @@
+# Library Change DocType module
+from .library_change import LibraryChange
@@ -1,8 +1,11 @@
 # Copyright (c) 2025, Yasser Bousrih and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import getdate
+
+from library_management.ledger import record_issue, record_return, set_defaults
 
 
 # On IntegrationTestCase, the doctype test records and all
@@ -19,4 +22,61 @@ class IntegrationTestLibraryTransaction(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		# Every new Article starts with one copy
+		self.article = frappe.get_doc({"doctype": "Article", "section_break_wvtm": "Ledger test"}).insert(
+			ignore_permissions=True
+		).name
+		self.copy = frappe.db.get_value("Article Copy", {"article": self.article}, "name")
+		self.member = frappe.get_doc({
+			"doctype": "Library Member",
+			"first_name": "Ledger",
+			"email": f"{frappe.generate_hash(length=10)}@example.com",
+		}).insert(ignore_permissions=True).name
+
+	def make_entry(self, transaction_type, date, **kwargs):
+		return frappe._dict(
+			type=transaction_type,
+			article=self.article,
+			article_copy=self.copy,
+			library_member=self.member,
+			date=getdate(date),
+			**kwargs,
+		)
+
+	def test_issue_gets_the_branch_and_loan_period_of_its_copy(self):
+		branch = frappe.get_doc({
+			"doctype": "Library Branch",
+			"branch_name": f"Branch {frappe.generate_hash(length=6)}",
+			"loan_period": 7,
+		}).insert(ignore_permissions=True).name
+		frappe.db.set_value("Article Copy", self.copy, "branch", branch)
+
+		issue = self.make_entry("Issue", "2024-03-01")
+		set_defaults([issue])
+		self.assertEqual(issue.branch, branch)
+		self.assertEqual(getdate(issue.due_date), getdate("2024-03-08"))
+
+		# Values already on the entry are kept
+		issue = self.make_entry("Issue", "2024-03-01", branch="Elsewhere", due_date=getdate("2024-04-01"))
+		set_defaults([issue])
+		self.assertEqual((issue.branch, issue.due_date), ("Elsewhere", getdate("2024-04-01")))
+
+	def test_return_without_issue_closes_the_oldest_open_loan(self):
+		first = record_issue(self.article, self.copy, self.member, date="2024-03-01")
+		second = record_issue(self.article, self.copy, self.member, date="2024-03-05")
+
+		ret = self.make_entry("Return", "2024-03-03")
+		set_defaults([ret])
+		self.assertEqual(ret.issue_transaction, first.name)
+
+		# Once the first loan is closed, the next Return takes the second one
+		record_return(first, self.copy, date="2024-03-03")
+		ret = self.make_entry("Return", "2024-03-10")
+		set_defaults([ret])
+		self.assertEqual(ret.issue_transaction, second.name)
+
+		# No open loan started on or before the Return's date
+		ret = self.make_entry("Return", "2024-03-04")
+		set_defaults([ret])
+		self.assertIsNone(ret.issue_transaction)
@@ -0,0 +1,2 @@
+# Library Transaction Archive DocType module
+from .library_transaction_archive import LibraryTransactionArchive
@@ -0,0 +1,87 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+from datetime import date, datetime
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from library_management.archive import get_legacy_return, make_cursor, match_legacy_returns, read_cursor
+from library_management.ledger import record_issue, record_return
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+def transaction(name, day, library_member="MEM-1", article="ART-1"):
+	return frappe._dict(name=name, library_member=library_member, article=article, date=date(2024, 3, day))
+
+
+class UnitTestLibraryTransactionArchive(UnitTestCase):
+	"""
+	Unit tests for LibraryTransactionArchive.
+	Use this class for testing individual functions and methods.
+	"""
+
+	def test_legacy_returns_pair_with_the_earliest_return_after_the_issue(self):
+		issues = [transaction("ISS-1", 1), transaction("ISS-2", 10)]
+		returns = [transaction("RET-1", 5), transaction("RET-2", 12)]
+		self.assertEqual(match_legacy_returns(issues, returns), {"ISS-1": "RET-1", "ISS-2": "RET-2"})
+
+	def test_legacy_returns_are_claimed_once(self):
+		issues = [transaction("ISS-1", 1), transaction("ISS-2", 2)]
+		returns = [transaction("RET-1", 5)]
+		self.assertEqual(match_legacy_returns(issues, returns), {"ISS-1": "RET-1"})
+
+	def test_legacy_returns_match_member_article_and_date(self):
+		issues = [transaction("ISS-1", 10)]
+		returns = [
+			transaction("RET-EARLIER", 9),
+			transaction("RET-OTHER-MEMBER", 11, library_member="MEM-2"),
+			transaction("RET-OTHER-ARTICLE", 11, article="ART-2"),
+		]
+		self.assertEqual(match_legacy_returns(issues, returns), {})
+
+		# Same-day returns count
+		self.assertEqual(match_legacy_returns(issues, [transaction("RET-1", 10)]), {"ISS-1": "RET-1"})
+
+	def test_history_cursor_round_trip(self):
+		row = frappe._dict(name="TXN-9", date=date(2024, 3, 1), creation=datetime(2024, 3, 1, 9, 30, 0, 123456))
+		self.assertEqual(read_cursor(make_cursor(row)), ("2024-03-01", "2024-03-01 09:30:00.123456", "TXN-9"))
+
+	def test_malformed_history_cursor(self):
+		for cursor in ("not json", '["2024-03-01", "TXN-9"]'):
+			with self.assertRaises(ValueError):
+				read_cursor(cursor)
+
+
+class IntegrationTestLibraryTransactionArchive(IntegrationTestCase):
+	"""
+	Integration tests for LibraryTransactionArchive.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_legacy_return_pairs_with_its_own_loan(self):
+		article = frappe.get_doc({"doctype": "Article", "section_break_wvtm": "Legacy return test"}).insert(
+			ignore_permissions=True
+		).name
+		copy = frappe.db.get_value("Article Copy", {"article": article}, "name")
+		member = frappe.get_doc({
+			"doctype": "Library Member",
+			"first_name": "Legacy",
+			"email": f"{frappe.generate_hash(length=10)}@example.com",
+		}).insert(ignore_permissions=True).name
+
+		first = record_issue(article, copy, member, date="2024-03-01")
+		second = record_issue(article, copy, member, date="2024-03-10")
+		ret = record_return(first, copy, date="2024-03-05")
+		# As recorded before Returns carried their Issue
+		frappe.db.set_value("Library Transaction", ret.name, "issue_transaction", None)
+
+		self.assertEqual(get_legacy_return(first), ret.name)
+		# The Return predates the second loan, so that loan stays open
+		self.assertIsNone(get_legacy_return(second))
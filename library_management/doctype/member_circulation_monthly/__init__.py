@@ -0,0 +1,2 @@
+# Member Circulation Monthly DocType module
+from .member_circulation_monthly import MemberCirculationMonthly
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Yasser Bousrih and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Member Circulation Monthly", {
+// 	refresh(frm) {
+
+// 	},
+// });
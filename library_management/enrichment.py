@@ -0,0 +1,274 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+ISBN metadata enrichment.
+
+`enrich_articles` walks Articles that have an ISBN but are missing author,
+publisher, description or image, in batches. For each batch it:
+
+1. reads already-known ISBNs from the `ISBN Metadata` cache (hits and
+   misses are both cached, so each ISBN is asked for once per provider);
+2. fetches the rest from the provider on a thread pool of
+   `isbn_enrichment_concurrency` workers, so throughput is bounded by that
+   setting rather than by provider latency;
+3. writes the new cache rows in one statement and fills only the empty
+   Article fields with one UPDATE, then commits.
+
+Worker threads only do HTTP; all database work stays on the job's thread.
+
+The provider is the last `isbn_metadata_provider` hook (a class path). The
+default talks to the Open Library books API at `isbn_metadata_url` from
+site_config, which can point at a local stand-in server for testing.
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+import requests
+from frappe.utils import now
+
+from library_management.catalogue import make_preview
+from library_management.changefeed import record_changes
+from library_management.settings import get_library_setting
+
+BATCH_SIZE = 200
+ENRICHED_FIELDS = ("author", "publisher", "description", "attach_image_pfdz")
+
+# Marks a provider error, as opposed to None for "no record for this ISBN"
+FETCH_FAILED = object()
+
+
+class MetadataProvider(ABC):
+	"""Interface for ISBN metadata sources. `fetch` runs on worker threads: no frappe.db here."""
+
+	name = None
+
+	@abstractmethod
+	def fetch(self, isbn):
+		"""Return {"author", "publisher", "description", "image"} (any may be None), or None if unknown."""
+
+
+class OpenLibraryProvider(MetadataProvider):
+	name = "openlibrary"
+	default_url = "https://openlibrary.org"
+	timeout = 10
+
+	def __init__(self, base_url=None):
+		self.base_url = (base_url or frappe.conf.isbn_metadata_url or self.default_url).rstrip("/")
+		self.session = requests.Session()
+
+	def fetch(self, isbn):
+		key = f"ISBN:{isbn}"
+		response = self.session.get(
+			f"{self.base_url}/api/books",
+			params={"bibkeys": key, "format": "json", "jscmd": "data"},
+			timeout=self.timeout,
+		)
+		response.raise_for_status()
+		record = response.json().get(key)
+		if not record:
+			return None
+
+		notes = record.get("notes")
+		if isinstance(notes, dict):
+			notes = notes.get("value")
+		excerpts = record.get("excerpts") or [{}]
+
+		return {
+			"author": ", ".join(author["name"] for author in record.get("authors", []) if author.get("name"))
+			or None,
+			"publisher": ", ".join(p["name"] for p in record.get("publishers", []) if p.get("name")) or None,
+			"description": notes or excerpts[0].get("text"),
+			"image": (record.get("cover") or {}).get("large") or (record.get("cover") or {}).get("medium"),
+		}
+
+
+def get_provider():
+	provider_path = (frappe.get_hooks("isbn_metadata_provider") or [None])[-1]
+	provider_class = frappe.get_attr(provider_path) if provider_path else OpenLibraryProvider
+	return provider_class()
+
+
+def clean_isbn(isbn):
+	return re.sub(r"[^0-9X]", "", (isbn or "").upper())
+
+
+def enrich_articles(concurrency=None, batch_size=BATCH_SIZE):
+	"""Long-queue job. Returns the number of Articles that received new data."""
+	provider = get_provider()
+	concurrency = int(concurrency or get_library_setting("isbn_enrichment_concurrency"))
+
+	enriched = 0
+	last_name = ""
+	with ThreadPoolExecutor(max_workers=concurrency) as pool:
+		while True:
+			articles = get_incomplete_articles(last_name, batch_size)
+			if not articles:
+				break
+
+			metadata = get_metadata(provider, pool, {clean_isbn(a.isbn) for a in articles} - {""})
+			enriched += len(update_articles(articles, metadata))
+
+			frappe.db.commit()
+			last_name = articles[-1].name
+
+	return enriched
+
+
+def get_incomplete_articles(after, limit):
+	missing = " OR ".join(f"IFNULL({field}, '') = ''" for field in ENRICHED_FIELDS)
+	return frappe.db.sql(
+		f"""
+		SELECT name, isbn, {", ".join(ENRICHED_FIELDS)}
+		FROM `tabArticle`
+		WHERE name > %(after)s
+		AND IFNULL(isbn, '') != ''
+		AND ({missing})
+		ORDER BY name
+		LIMIT %(limit)s
+		""",
+		{"after": after, "limit": limit},
+		as_dict=True,
+	)
+
+
+def get_metadata(provider, pool, isbns):
+	"""{isbn: metadata or None} from the cache, fetching and caching whatever is not there yet."""
+	if not isbns:
+		return {}
+
+	cached = frappe.db.sql(
+		"""
+		SELECT isbn, found, metadata
+		FROM `tabISBN Metadata`
+		WHERE name IN %(names)s
+		""",
+		{"names": [cache_name(provider, isbn) for isbn in isbns]},
+		as_dict=True,
+	)
+	metadata = {row.isbn: json.loads(row.metadata) if row.found else None for row in cached}
+
+	missing = sorted(isbns - set(metadata))
+	fetched = dict(zip(missing, pool.map(lambda isbn: safe_fetch(provider, isbn), missing), strict=True))
+
+	# Provider errors are not cached so the next run retries them
+	fetched = {isbn: result for isbn, result in fetched.items() if result is not FETCH_FAILED}
+	cache_results(provider, fetched)
+	metadata.update(fetched)
+	return metadata
+
+
+def safe_fetch(provider, isbn):
+	try:
+		return provider.fetch(isbn)
+	except Exception:
+		return FETCH_FAILED
+
+
+def cache_name(provider, isbn):
+	return f"{provider.name}:{isbn}"
+
+
+def cache_results(provider, results):
+	if not results:
+		return
+
+	timestamp = now()
+	rows = []
+	values = {"now": timestamp, "provider": provider.name}
+	for i, (isbn, result) in enumerate(results.items()):
+		rows.append(
+			f"(%(name{i})s, %(now)s, %(now)s, 'Administrator', 'Administrator', "
+			f"%(isbn{i})s, %(provider)s, %(found{i})s, %(now)s, %(metadata{i})s)"
+		)
+		values.update(
+			{
+				f"name{i}": cache_name(provider, isbn),
+				f"isbn{i}": isbn,
+				f"found{i}": 1 if result else 0,
+				f"metadata{i}": json.dumps(result) if result else None,
+			}
+		)
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabISBN Metadata`
+			(name, creation, modified, modified_by, owner, isbn, provider, found, fetched_on, metadata)
+		VALUES {", ".join(rows)}
+		ON DUPLICATE KEY UPDATE
+			found = VALUES(found),
+			fetched_on = VALUES(fetched_on),
+			metadata = VALUES(metadata),
+			modified = VALUES(modified)
+		""",
+		values,
+	)
+
+
+def update_articles(articles, metadata):
+	"""
+	Fill each Article's empty fields from its ISBN's metadata with one UPDATE
+	for the whole batch; returns the names that changed.
+
+	Raw SQL skips the Article hooks, so their side effects are done here: the
+	description preview, the change feed and thumbnails for new images.
+	`modified` is bumped, which is what the article fragment cache keys on.
+	The scan cache needs nothing, as it only maps ISBNs and copy barcodes and
+	neither is written here.
+	"""
+	updates = {}
+	for article in articles:
+		changed = get_updates(article, metadata.get(clean_isbn(article.isbn)))
+		if changed:
+			updates[article.name] = changed
+	if not updates:
+		return []
+
+	values = {"modified": now(), "names": list(updates)}
+	assignments = []
+	for field in (*ENRICHED_FIELDS, "description_preview"):
+		cases = []
+		for i, (name, changed) in enumerate(updates.items()):
+			if field in changed:
+				cases.append(f"WHEN %(name{i})s THEN %({field}{i})s")
+				values[f"name{i}"] = name
+				values[f"{field}{i}"] = changed[field]
+		if cases:
+			assignments.append(f"`{field}` = CASE name {' '.join(cases)} ELSE `{field}` END")
+
+	frappe.db.sql(
+		f"UPDATE `tabArticle` SET {', '.join(assignments)}, modified = %(modified)s WHERE name IN %(names)s",
+		values,
+	)
+	record_changes("Article", list(updates), action="Update")
+
+	for name, changed in updates.items():
+		if "attach_image_pfdz" in changed:
+			frappe.enqueue(
+				"library_management.thumbnails.generate_for_article",
+				queue="short",
+				article=name,
+				enqueue_after_commit=True,
+			)
+	return list(updates)
+
+
+def get_updates(article, metadata):
+	"""{field: value} for the Article's empty fields that `metadata` can fill."""
+	if not metadata:
+		return {}
+
+	incoming = {
+		"author": metadata.get("author"),
+		"publisher": metadata.get("publisher"),
+		"description": metadata.get("description"),
+		"attach_image_pfdz": metadata.get("image"),
+	}
+	updates = {field: value for field, value in incoming.items() if value and not article.get(field)}
+	if "description" in updates:
+		updates["description_preview"] = make_preview(updates["description"])
+	return updates
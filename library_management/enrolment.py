@@ -0,0 +1,162 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Bulk membership enrolment and renewal.
+
+`enrol` consumes an iterable of {"email", "first_name", "last_name"} rows
+(e.g. a CSV read as a stream) in chunks of CHUNK_SIZE. Per chunk it resolves
+existing Library Members by email and their latest membership end dates with
+one set-based query each, inserts the missing members and the new
+memberships with multi-row inserts, and commits.
+
+- Members without a running membership get one starting today.
+- With `renew`, members whose membership ends within RENEW_WINDOW_DAYS get
+  the next term starting the day after it ends.
+- Everyone else is skipped, so rerunning a cohort file is harmless.
+
+Terms are `days` long, like `join_membership`. Run it with
+`bench --site <site> enrol-members cohort.csv [--renew]` or through the
+`bulk_enrol_members` API, which queues it as a job.
+"""
+
+import csv
+from itertools import islice
+
+import frappe
+from frappe.utils import add_days, getdate, now, today
+
+from library_management.changefeed import record_changes
+
+CHUNK_SIZE = 2000
+MEMBERSHIP_DAYS = 365
+RENEW_WINDOW_DAYS = 30
+
+
+def enrol_from_csv(path, renew=False, days=MEMBERSHIP_DAYS):
+	"""Enrol the members of a CSV file with email, first_name and last_name columns."""
+	with open(path, newline="", encoding="utf-8-sig") as f:
+		return enrol(csv.DictReader(f), renew=renew, days=days)
+
+
+def enrol(rows, renew=False, days=MEMBERSHIP_DAYS):
+	totals = frappe._dict(members_created=0, enrolled=0, renewed=0, skipped=0, invalid=0)
+	rows = iter(rows)
+	while True:
+		chunk = list(islice(rows, CHUNK_SIZE))
+		if not chunk:
+			break
+		for key, value in enrol_chunk(chunk, renew, days).items():
+			totals[key] += value
+		frappe.db.commit()
+	return totals
+
+
+def enrol_chunk(rows, renew, days):
+	counts = dict(members_created=0, enrolled=0, renewed=0, skipped=0, invalid=0)
+
+	people = {}
+	for row in rows:
+		email = (row.get("email") or "").strip().lower()
+		if "@" not in email:
+			counts["invalid"] += 1
+			continue
+		people.setdefault(email, row)
+	if not people:
+		return counts
+
+	members = dict(
+		frappe.db.sql(
+			"SELECT LOWER(email), name FROM `tabLibrary Member` WHERE email IN %(emails)s",
+			{"emails": list(people)},
+		)
+	)
+	counts["members_created"] = create_members(people, members)
+
+	ends = dict(
+		frappe.db.sql(
+			"""
+			SELECT library_member, MAX(to_date)
+			FROM `tabLibrary Membership`
+			WHERE library_member IN %(members)s
+			AND to_date >= %(today)s
+			GROUP BY library_member
+			""",
+			{"members": list(members.values()), "today": today()},
+		)
+	)
+
+	start_today = getdate(today())
+	renew_before = add_days(start_today, RENEW_WINDOW_DAYS)
+	memberships = []
+	for member in members.values():
+		end = ends.get(member)
+		if not end:
+			from_date = start_today
+			counts["enrolled"] += 1
+		elif renew and end <= renew_before:
+			from_date = add_days(end, 1)
+			counts["renewed"] += 1
+		else:
+			counts["skipped"] += 1
+			continue
+		memberships.append((member, from_date, add_days(from_date, days)))
+
+	insert_memberships(memberships)
+	return counts
+
+
+def create_members(people, members):
+	"""Insert Library Members for emails not in `members` and add them to it."""
+	timestamp = now()
+	user = frappe.session.user
+	values = []
+	for email, row in people.items():
+		if email in members:
+			continue
+		name = frappe.generate_hash(length=10)
+		members[email] = name
+		values.append(
+			(
+				name,
+				timestamp,
+				timestamp,
+				user,
+				user,
+				(row.get("first_name") or "").strip() or email.split("@")[0],
+				(row.get("last_name") or "").strip(),
+				email,
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Library Member",
+		fields=["name", "creation", "modified", "owner", "modified_by", "first_name", "last_name", "email"],
+		values=values,
+	)
+	return len(values)
+
+
+def insert_memberships(memberships):
+	timestamp = now()
+	user = frappe.session.user
+	values = [
+		(frappe.generate_hash(length=10), timestamp, timestamp, user, user, member, from_date, to_date)
+		for member, from_date, to_date in memberships
+	]
+	frappe.db.bulk_insert(
+		"Library Membership",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"library_member",
+			"from_date",
+			"to_date",
+		],
+		values=values,
+	)
+	# Bulk inserts skip doc events, so feed mirrors explicitly
+	record_changes("Library Membership", [row[0] for row in values])
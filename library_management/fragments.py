@@ -0,0 +1,101 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Rendered-fragment cache for the Article web views.
+
+The article-dependent markup of `article.html` (detail) and `article_row.html`
+(list row) lives in small include templates rendered through
+`render_article_fragment`. The HTML is cached in a bounded per-process LRU in
+front of a shared Redis tier, keyed on the article name, `modified` and
+UNBUMPED_FIELDS. Those are the fields written without touching `modified`:
+`status` by the rental counters and `image_hash` by the thumbnail job. An
+edited article gets new keys, and the old entries age out of both tiers.
+
+The per-visitor part (rent button, membership check) stays in the outer
+templates. `get_rent_state` computes it once per request instead of once per
+list row.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+import frappe
+from markupsafe import Markup
+
+FRAGMENT_TEMPLATES = {
+	"detail": "templates/includes/article/detail.html",
+	"row": "templates/includes/article/row.html",
+}
+
+# Per-process tier: ~2 KB per fragment keeps this around 4 MB per worker
+LOCAL_MAX_ENTRIES = 2048
+REDIS_TTL = 24 * 60 * 60
+
+# Fields that can change without `modified` changing; every one of them is part of the key
+UNBUMPED_FIELDS = ("status", "image_hash")
+
+_local = OrderedDict()
+_local_lock = Lock()
+
+
+def render_article_fragment(doc, variant="row"):
+	"""Cached HTML for the `variant` fragment of an Article document or row dict."""
+	key = fragment_key(doc, variant)
+
+	html = get_local(key)
+	if html is None:
+		html = frappe.cache().get_value(key)
+		if html is None:
+			html = frappe.render_template(FRAGMENT_TEMPLATES[variant], {"doc": doc})
+			frappe.cache().set_value(key, html, expires_in_sec=REDIS_TTL)
+		set_local(key, html)
+	return Markup(html)
+
+
+def fragment_key(doc, variant):
+	parts = [variant, doc.name, doc.modified, *(doc.get(field) for field in UNBUMPED_FIELDS)]
+	return "library_management:article_fragment:" + ":".join(str(part or "") for part in parts)
+
+
+def get_local(key):
+	with _local_lock:
+		html = _local.get(key)
+		if html is not None:
+			_local.move_to_end(key)
+		return html
+
+
+def set_local(key, html):
+	with _local_lock:
+		_local[key] = html
+		_local.move_to_end(key)
+		while len(_local) > LOCAL_MAX_ENTRIES:
+			_local.popitem(last=False)
+
+
+def get_rent_state():
+	"""The current visitor's member record and active memberships, computed once per request."""
+	state = frappe.flags.library_rent_state
+	if state is None:
+		user = frappe.session.user
+		email = frappe.db.get_value("User", user, "email") if user != "Guest" else None
+		library_member = frappe.db.exists("Library Member", {"email": email}) if email else None
+		memberships = []
+		if library_member:
+			memberships = frappe.get_all(
+				"Library Membership",
+				filters={
+					"library_member": library_member,
+					"from_date": ["<=", frappe.utils.today()],
+					"to_date": [">=", frappe.utils.today()],
+				},
+				fields=["name", "from_date", "to_date"],
+			)
+		state = frappe.flags.library_rent_state = frappe._dict(
+			user=user,
+			email=email,
+			library_member=library_member,
+			memberships=memberships,
+		)
+	return state
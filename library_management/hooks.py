@@ -13,11 +13,7 @@ app_icon = "octicon octicon-book"
 
 # Each item in the list will be shown as an app in the apps page
 add_to_apps_screen = [
-	{
-		"name": "library_management",
-		"title": "Library Management",
-		"route": "/library_management"
-	}
+	{"name": "library_management", "title": "Library Management", "route": "/library_management"}
 ]
 
 # Modules
@@ -27,10 +23,7 @@ modules = ["library_management"]
 # Website Settings
 # ------------------
 # Disable default Frappe navbar
-website_context = {
-    "hide_sidebar": True,
-    "hide_navbar": True
-}
+website_context = {"hide_sidebar": True, "hide_navbar": True}
 
 # Includes in <head>
 # ------------------
@@ -85,14 +78,14 @@ website_context = {
 # ---------------
 # Define custom routes for web pages
 website_route_rules = [
-    {"from_route": "/", "to_route": "home"},
-    {"from_route": "/home", "to_route": "home"},
-    {"from_route": "/signup", "to_route": "signup"},
-    {"from_route": "/login", "to_route": "login"},
-    {"from_route": "/articles-page", "to_route": "articles-page"},
-    {"from_route": "/article-detail", "to_route": "article-detail"},
-    {"from_route": "/membership", "to_route": "membership"},
-    {"from_route": "/my-articles", "to_route": "my-articles"},
+	{"from_route": "/", "to_route": "home"},
+	{"from_route": "/home", "to_route": "home"},
+	{"from_route": "/signup", "to_route": "signup"},
+	{"from_route": "/login", "to_route": "login"},
+	{"from_route": "/articles-page", "to_route": "articles-page"},
+	{"from_route": "/article-detail", "to_route": "article-detail"},
+	{"from_route": "/membership", "to_route": "membership"},
+	{"from_route": "/my-articles", "to_route": "my-articles"},
 ]
 
 # Jinja
@@ -104,12 +97,24 @@ website_route_rules = [
 # 	"filters": "library_management.library_management.utils.jinja_filters"
 # }
 
+jinja = {
+	"methods": [
+		"library_management.fragments.render_article_fragment",
+		"library_management.fragments.get_rent_state",
+	],
+}
+
 # Installation
 # ------------
 
 # before_install = "library_management.library_management.install.before_install"
 # after_install = "library_management.setup_web_pages.after_install"
 
+after_migrate = [
+	"library_management.install.after_migrate",
+	"library_management.prewarm.after_migrate",
+]
+
 # Uninstallation
 # ------------
 
@@ -170,6 +175,62 @@ website_route_rules = [
 # 	}
 # }
 
+doc_events = {
+	"Article": {
+		"validate": [
+			"library_management.catalogue.set_description_preview",
+			"library_management.catalogue.set_isbn_normalized",
+		],
+		"after_insert": "library_management.inventory.on_article_insert",
+		"on_update": [
+			"library_management.thumbnails.on_article_update",
+			"library_management.scanning.clear_cache",
+		],
+		"on_change": "library_management.changefeed.on_change",
+		"after_delete": [
+			"library_management.changefeed.on_change",
+			"library_management.scanning.clear_cache",
+		],
+	},
+	"Article Copy": {
+		"validate": "library_management.branches.set_copy_branch",
+		"after_insert": "library_management.reservations.offer_new_copy",
+		"on_update": [
+			"library_management.inventory.on_copy_change",
+			"library_management.scanning.clear_cache",
+		],
+		"after_delete": [
+			"library_management.inventory.on_copy_change",
+			"library_management.scanning.clear_cache",
+		],
+	},
+	"Library Transaction": {
+		# Shared with library_management.ledger.append, which writes rows without the lifecycle
+		"validate": "library_management.ledger.set_transaction_defaults",
+		"on_submit": "library_management.ledger.on_transaction_submit",
+		"on_cancel": "library_management.ledger.on_transaction_cancel",
+		"on_change": [
+			"library_management.changefeed.on_change",
+			"library_management.replica.stick_to_primary",
+		],
+		"after_delete": "library_management.changefeed.on_change",
+	},
+	"Library Membership": {
+		"on_change": [
+			"library_management.changefeed.on_change",
+			"library_management.replica.stick_to_primary",
+		],
+		"after_delete": "library_management.changefeed.on_change",
+	},
+	"Article Reservation": {
+		"on_change": "library_management.replica.stick_to_primary",
+	},
+	"Library Branch": {
+		"on_update": "library_management.branches.clear_cache",
+		"after_delete": "library_management.branches.clear_cache",
+	},
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -191,6 +252,44 @@ website_route_rules = [
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"* * * * *": [
+			"library_management.snapshot.publish_catalogue",
+		],
+	},
+	"hourly": [
+		"library_management.profiler.trim_profiles",
+	],
+	"daily": [
+		"library_management.reservations.expire_uncollected_holds",
+		"library_management.notifications.send_reminder_digests",
+	],
+	"daily_long": [
+		"library_management.archive.archive_closed_loans",
+		"library_management.recommendations.rebuild_recommendations",
+		"library_management.changefeed.compact_change_log",
+	],
+}
+
+# ISBN Enrichment
+# ---------------
+# Class implementing library_management.enrichment.MetadataProvider; the last app to set it wins
+
+isbn_metadata_provider = "library_management.enrichment.OpenLibraryProvider"
+
+# Cache Prewarming
+# ----------------
+# Warmers run in parallel by library_management.prewarm after migrate and process restarts
+
+library_prewarm_tasks = [
+	"library_management.prewarm.warm_metadata",
+	"library_management.prewarm.warm_settings",
+	"library_management.prewarm.warm_catalogue",
+	"library_management.prewarm.warm_popular_articles",
+	"library_management.prewarm.warm_routes",
+]
+
 # Testing
 # -------
 
@@ -224,6 +323,14 @@ website_route_rules = [
 # before_request = ["library_management.library_management.utils.before_request"]
 # after_request = ["library_management.library_management.utils.after_request"]
 
+before_request = [
+	"library_management.profiler.before_request",
+	"library_management.prewarm.on_process_boot",
+]
+after_request = ["library_management.profiler.after_request"]
+
+before_job = ["library_management.prewarm.on_process_boot"]
+
 # Job Events
 # ----------
 # before_job = ["library_management.library_management.utils.before_job"]
@@ -269,34 +376,18 @@ website_route_rules = [
 
 # Fixtures - what to export from database to code
 fixtures = [
-    {
-        "dt": "Role",
-        "filters": [
-            ["name", "in", ["Librarian", "Library Member"]]
-        ]
-    },
-    {
-        "dt": "Module Def",
-        "filters": [
-            ["module_name", "=", "library_management"]
-        ]
-    },
-    {
-        "dt": "Web Page",
-        "filters": [
-            ["name", "in", ["home", "signup", "login", "articles-page", "article-detail", "membership", "my-articles"]]
-        ]
-    },
-    {
-        "dt": "DocType",
-        "filters": [
-            ["module", "=", "library_management"]
-        ]
-    },
-    {
-        "dt": "Web Template",
-        "filters": [
-            ["module", "=", "library_management"]
-        ]
-    }
-]
\ No newline at end of file
+	{"dt": "Role", "filters": [["name", "in", ["Librarian", "Library Member"]]]},
+	{"dt": "Module Def", "filters": [["module_name", "=", "library_management"]]},
+	{
+		"dt": "Web Page",
+		"filters": [
+			[
+				"name",
+				"in",
+				["home", "signup", "login", "articles-page", "article-detail", "membership", "my-articles"],
+			]
+		],
+	},
+	{"dt": "DocType", "filters": [["module", "=", "library_management"]]},
+	{"dt": "Web Template", "filters": [["module", "=", "library_management"]]},
+]
@@ -0,0 +1,101 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Idempotency keys for state-changing API endpoints.
+
+Clients send an `Idempotency-Key` header (or `idempotency_key` parameter)
+with a POST. The first request with a key claims it in Redis and runs; its
+successful response is stored under the key for `ttl` seconds, and any retry
+with the same key gets that stored response back from a single GET, without
+touching the database. A retry that arrives while the first request is still
+running gets HTTP 409; a key reused with a different payload gets HTTP 422.
+Failed responses are not stored, so the client can retry them.
+
+Keys are scoped to the user and the endpoint.
+"""
+
+import functools
+import hashlib
+import json
+
+import frappe
+
+DEFAULT_TTL = 24 * 3600
+
+# How long a claimed key blocks retries if the worker dies before finishing
+PENDING_TTL = 60
+PENDING = "pending"
+
+
+def idempotent(ttl=DEFAULT_TTL):
+	"""Make a whitelisted endpoint replay its response for repeated idempotency keys."""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			key = get_request_key(fn.__name__)
+			if not key:
+				return fn(*args, **kwargs)
+
+			cache = frappe.cache()
+			cache_key = cache.make_key(
+				f"library_management:idempotency:{frappe.session.user}:{fn.__name__}:{key}"
+			)
+			fingerprint = get_fingerprint()
+
+			if not cache.set(
+				cache_key, json.dumps({"state": PENDING, "fingerprint": fingerprint}), nx=True, ex=PENDING_TTL
+			):
+				return replay(cache.get(cache_key), fingerprint)
+
+			response = None
+			try:
+				response = fn(*args, **kwargs)
+			finally:
+				if isinstance(response, dict) and response.get("success"):
+					cache.set(
+						cache_key,
+						frappe.as_json({"state": "done", "fingerprint": fingerprint, "response": response}),
+						ex=ttl,
+					)
+				else:
+					cache.delete(cache_key)
+			return response
+
+		return wrapper
+
+	return decorator
+
+
+def get_request_key(endpoint):
+	"""The client's key, only when `endpoint` is the method this request called."""
+	request = getattr(frappe.local, "request", None)
+	if not request or not request.path.rstrip("/").endswith(f".{endpoint}"):
+		return None
+	return frappe.get_request_header("Idempotency-Key") or frappe.form_dict.get("idempotency_key")
+
+
+def get_fingerprint():
+	payload = {k: v for k, v in frappe.form_dict.items() if k not in ("cmd", "idempotency_key")}
+	return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def replay(stored, fingerprint):
+	stored = json.loads(stored) if stored else None
+	if not stored:
+		# Claimed and released in between: the first attempt failed, so ask for a retry
+		return conflict(409, "The original request with this idempotency key failed. Please retry.")
+	if stored["fingerprint"] != fingerprint:
+		return conflict(422, "This idempotency key was already used with a different request.")
+	if stored["state"] == PENDING:
+		return conflict(409, "A request with this idempotency key is still being processed.")
+
+	response = stored["response"]
+	response["idempotent_replay"] = True
+	return response
+
+
+def conflict(status_code, message):
+	frappe.local.response["http_status_code"] = status_code
+	return {"success": False, "message": message}
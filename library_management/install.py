@@ -0,0 +1,56 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+import frappe
+
+# Composite indexes for the hot circulation paths. The DocTypes are installed
+# from fixtures, so these are (re)applied after every migrate instead of via
+# on_doctype_update in the controllers.
+INDEXES = {
+	"Article Copy": [["article", "status"], ["branch", "article", "status"]],
+	"Article Reservation": [
+		["article", "status", "priority", "requested_on"],
+		["library_member", "status"],
+		["status", "allocated_on"],
+	],
+	"Library Member": [["email"]],
+	"Library Membership": [["library_member", "to_date"], ["expiry_notice_sent", "to_date"]],
+	"Library Transaction Archive": [["library_member", "date", "transaction_creation", "type", "article"]],
+	# Every Issue and Return writes each of these; add one only for a query that needs it
+	"Library Transaction": [
+		["type", "date"],
+		["article_copy", "type"],
+		["issue_transaction"],
+		["due_notice_sent", "due_date"],
+		# Covers a member-history page (archive.get_member_history) and the rental-limit count
+		["library_member", "date", "creation", "type", "article", "docstatus"],
+	],
+	"Article Circulation Daily": [["date", "article", "issues", "returns"]],
+	"Member Circulation Monthly": [["month", "library_member", "issues"]],
+	"Article Recommendation": [["article", "rank"]],
+	"Library Change": [["reference_doctype", "reference_name"], ["creation"]],
+	"API Profile": [["creation"]],
+}
+
+
+# Indexes (by name) that earlier versions added and no query uses any more
+OBSOLETE_INDEXES = {
+	"Library Transaction": ["branch_type_date_index", "branch_library_member_type_index"],
+}
+
+
+def after_migrate():
+	drop_obsolete_indexes()
+	add_indexes()
+
+
+def add_indexes():
+	for doctype, indexes in INDEXES.items():
+		for fields in indexes:
+			frappe.db.add_index(doctype, fields)
+
+
+def drop_obsolete_indexes():
+	for doctype, names in OBSOLETE_INDEXES.items():
+		for name in names:
+			frappe.db.sql_ddl(f"ALTER TABLE `tab{doctype}` DROP INDEX IF EXISTS `{name}`")
@@ -0,0 +1,162 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Copy-level inventory for Articles.
+
+Every Article owns one or more Article Copy rows. `tabArticle` carries the
+denormalized `total_copies` / `available_copies` counters so listings and
+availability checks read a single integer instead of scanning transactions.
+"""
+
+import frappe
+from frappe.utils import now
+
+from library_management.changefeed import record_change
+from library_management.realtime import queue_availability_push
+
+
+def article_status_sql(article_ref="`tabArticle`.name"):
+	"""
+	SQL expression deriving the legacy Article `status` from the counters.
+	Evaluated after `available_copies` has been assigned in the same UPDATE
+	(MariaDB applies single-table SET clauses left to right).
+	"""
+	return f"""
+		CASE
+			WHEN available_copies > 0 THEN 'Available'
+			WHEN EXISTS (
+				SELECT 1 FROM `tabArticle Copy` rc
+				WHERE rc.article = {article_ref} AND rc.status = 'Reserved'
+			) THEN 'Reserved'
+			ELSE 'Issued'
+		END
+	"""
+
+
+def claim_copy(article, preferred=None, branch=None):
+	"""
+	Lock one available copy of `article` and mark it Issued.
+	Rows already locked by a concurrent rental are skipped, so simultaneous
+	rentals of the same title land on different copies instead of queueing.
+	`preferred` (e.g. the scanned copy) is taken if it is free; `branch`
+	restricts the search to that branch's copies.
+	Returns the copy name, or None when no copy is free.
+	"""
+	branch_condition = "AND branch = %(branch)s" if branch else ""
+	copy = frappe.db.sql(
+		f"""
+		SELECT name
+		FROM `tabArticle Copy`
+		WHERE article = %(article)s
+		AND status = 'Available'
+		{branch_condition}
+		ORDER BY name = %(preferred)s DESC
+		LIMIT 1
+		FOR UPDATE SKIP LOCKED
+		""",
+		{"article": article, "preferred": preferred, "branch": branch},
+	)
+	if not copy:
+		return None
+
+	copy = copy[0][0]
+	set_copy_status(copy, "Issued")
+	return copy
+
+
+def release_copy(copy):
+	"""
+	Mark an issued or reserved copy Available again.
+	Returns False if the copy was already available (e.g. a repeated return).
+	"""
+	if get_locked_status(copy) in (None, "Available"):
+		return False
+
+	set_copy_status(copy, "Available")
+	return True
+
+
+def get_locked_status(copy):
+	"""Lock a copy row for the rest of the transaction and return its status."""
+	status = frappe.db.sql(
+		"SELECT status FROM `tabArticle Copy` WHERE name = %s FOR UPDATE",
+		(copy,),
+	)
+	return status[0][0] if status else None
+
+
+def find_unavailable_copy(article):
+	"""Pick an issued copy of `article`; used for loans recorded before copies existed."""
+	return frappe.db.get_value("Article Copy", {"article": article, "status": "Issued"}, "name")
+
+
+def set_copy_status(copy, status):
+	frappe.db.sql(
+		"UPDATE `tabArticle Copy` SET status = %s, modified = %s WHERE name = %s",
+		(status, now(), copy),
+	)
+
+
+def adjust_available(article, delta):
+	"""
+	Atomically move the `available_copies` counter by `delta` and keep the
+	legacy `status` field in step with it. Callers should run this as the
+	last write before committing so the Article row lock is held briefly.
+	"""
+	frappe.db.sql(
+		f"""
+		UPDATE `tabArticle`
+		SET available_copies = LEAST(GREATEST(available_copies + %(delta)s, 0), total_copies),
+			status = {article_status_sql()}
+		WHERE name = %(article)s
+		""",
+		{"article": article, "delta": delta},
+	)
+	queue_availability_push(article)
+	record_change("Article", article)
+
+
+def refresh_status(article):
+	"""Re-derive `status` after a copy moved between Issued and Reserved."""
+	adjust_available(article, 0)
+
+
+def sync_article_counters(article):
+	"""Recount an Article's copies from `tabArticle Copy` (desk edits, patches)."""
+	frappe.db.sql(
+		f"""
+		UPDATE `tabArticle` a
+		SET total_copies = (
+				SELECT COUNT(*) FROM `tabArticle Copy` c WHERE c.article = a.name
+			),
+			available_copies = (
+				SELECT COUNT(*) FROM `tabArticle Copy` c
+				WHERE c.article = a.name AND c.status = 'Available'
+			),
+			status = {article_status_sql("a.name")}
+		WHERE a.name = %s
+		""",
+		(article,),
+	)
+	queue_availability_push(article)
+	record_change("Article", article)
+
+
+def on_article_insert(doc, method=None):
+	"""Article after_insert: every new Article starts with one lendable copy."""
+	if not frappe.db.exists("Article Copy", {"article": doc.name}):
+		add_copies(doc.name, 1)
+
+
+def on_copy_change(doc, method=None):
+	"""Article Copy on_update / after_delete: keep the parent's counters exact."""
+	sync_article_counters(doc.article)
+
+
+def add_copies(article, count=1):
+	"""Create `count` available copies of `article` and refresh its counters."""
+	for _ in range(count):
+		frappe.get_doc({"doctype": "Article Copy", "article": article, "status": "Available"}).insert(
+			ignore_permissions=True
+		)
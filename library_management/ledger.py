@@ -0,0 +1,266 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Append-only circulation ledger.
+
+Issues and Returns are immutable once written, so they skip the document
+lifecycle (insert + submit: two validations, permission checks, versioning
+and hook dispatch). Instead they are appended to `tabLibrary Transaction` as
+already-submitted rows: one multi-row INSERT per call, whether that is one
+event or a batch.
+
+The Library Transaction doc_events call the same functions as the ledger, so
+both write paths behave alike:
+- `set_defaults`: branch of the copy, due date of Issues and the Issue of
+  Returns entered without one (validate);
+- `apply_circulation`: circulation rollups, realtime availability push and
+  primary stickiness (on_submit / on_cancel).
+The change feed entry comes from `changefeed.on_change` for documents and from
+one bulk `record_changes` for ledger rows.
+
+Rows stay ordinary submitted Library Transactions. The desk list, reports and
+cancellation keep working without a separate view.
+`bench --site <site> execute library_management.ledger.benchmark` compares
+both write paths.
+"""
+
+import time
+
+import frappe
+from frappe.utils import add_days, getdate, now, today
+
+from library_management import analytics
+from library_management.branches import get_branch_setting
+from library_management.changefeed import record_changes
+from library_management.realtime import queue_availability_push
+from library_management.replica import stick_to_primary
+
+DOCTYPE = "Library Transaction"
+LEDGER_FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"modified_by",
+	"owner",
+	"docstatus",
+	"idx",
+	"article",
+	"article_copy",
+	"library_member",
+	"branch",
+	"date",
+	"type",
+	"due_date",
+	"issue_transaction",
+)
+
+
+def record_issue(article, article_copy, library_member, date=None):
+	"""Append one Issue; returns the entry (with `name` and `due_date`)."""
+	return append(
+		[
+			frappe._dict(
+				type="Issue",
+				article=article,
+				article_copy=article_copy,
+				library_member=library_member,
+				date=date,
+			)
+		]
+	)[0]
+
+
+def record_return(issue, article_copy, date=None):
+	"""Append the Return of `issue` (a row with name, article and library_member)."""
+	return append(
+		[
+			frappe._dict(
+				type="Return",
+				article=issue.article,
+				article_copy=article_copy,
+				library_member=issue.library_member,
+				issue_transaction=issue.name,
+				date=date,
+			)
+		]
+	)[0]
+
+
+def append(entries):
+	"""Write Issue/Return entries with one INSERT and apply their side effects."""
+	if not entries:
+		return entries
+
+	timestamp = now()
+	user = frappe.session.user
+	for entry in entries:
+		entry.name = frappe.generate_hash(length=10)
+		entry.creation = entry.modified = timestamp
+		entry.owner = entry.modified_by = user
+		entry.docstatus = 1
+		entry.idx = 0
+		entry.date = getdate(entry.date or today())
+	set_defaults(entries)
+
+	frappe.db.bulk_insert(
+		DOCTYPE,
+		fields=list(LEDGER_FIELDS),
+		values=[tuple(entry.get(field) for field in LEDGER_FIELDS) for entry in entries],
+	)
+
+	apply_circulation(entries, 1)
+	record_changes(DOCTYPE, [entry.name for entry in entries])
+	return entries
+
+
+def set_defaults(entries):
+	"""
+	Give each transaction the branch of its copy and, for Issues, a due date
+	`loan_period` (of that branch) days after its date. Reads the branches of
+	all copies in one query.
+	"""
+	copies = [entry.article_copy for entry in entries if entry.article_copy and not entry.branch]
+	branch_of = (
+		dict(
+			frappe.db.sql(
+				"SELECT name, branch FROM `tabArticle Copy` WHERE name IN %(copies)s",
+				{"copies": copies},
+			)
+		)
+		if copies
+		else {}
+	)
+
+	for entry in entries:
+		entry.branch = entry.branch or branch_of.get(entry.article_copy)
+		if entry.type == "Issue" and not entry.due_date:
+			entry.due_date = add_days(entry.date or today(), get_branch_setting("loan_period", entry.branch))
+		elif entry.type == "Return" and not entry.issue_transaction:
+			entry.issue_transaction = get_open_issue_for_return(entry)
+
+
+def get_open_issue_for_return(entry):
+	"""
+	The member's oldest open Issue of the article on or before the Return's
+	date. Returns entered on the desk without an Issue are linked to it, so
+	open-loan checks, which only follow the link, see the loan as closed.
+	"""
+	issue = frappe.db.sql(
+		"""
+		SELECT i.name
+		FROM `tabLibrary Transaction` i
+		WHERE i.library_member = %(member)s
+		AND i.article = %(article)s
+		AND i.type = 'Issue'
+		AND i.docstatus = 1
+		AND i.date <= %(date)s
+		AND NOT EXISTS (
+			SELECT 1 FROM `tabLibrary Transaction` r
+			WHERE r.issue_transaction = i.name AND r.docstatus = 1
+		)
+		ORDER BY i.date, i.creation
+		LIMIT 1
+		""",
+		{"member": entry.library_member, "article": entry.article, "date": entry.date or today()},
+	)
+	return issue[0][0] if issue else None
+
+
+def apply_circulation(entries, delta):
+	"""Side effects of submitting (delta 1) or cancelling (delta -1) transactions."""
+	for entry in entries:
+		analytics.record_event(entry.article, entry.library_member, entry.date, entry.type, delta)
+	for article in {entry.article for entry in entries if entry.article}:
+		queue_availability_push(article)
+	stick_to_primary()
+
+
+def set_transaction_defaults(doc, method=None):
+	"""Library Transaction validate."""
+	set_defaults([doc])
+
+
+def on_transaction_submit(doc, method=None):
+	"""Library Transaction on_submit."""
+	apply_circulation([doc], 1)
+
+
+def on_transaction_cancel(doc, method=None):
+	"""Library Transaction on_cancel."""
+	apply_circulation([doc], -1)
+
+
+def benchmark(events=200):
+	"""Issue/Return events per second via insert + submit vs the ledger (rolled back)."""
+	copy = frappe.db.sql("SELECT name, article FROM `tabArticle Copy` LIMIT 1", as_dict=True)
+	member = frappe.db.sql("SELECT name FROM `tabLibrary Member` LIMIT 1")
+	if not copy or not member:
+		return None
+	copy, member = copy[0], member[0][0]
+
+	def lifecycle():
+		issue = frappe.get_doc(
+			{
+				"doctype": DOCTYPE,
+				"article": copy.article,
+				"article_copy": copy.name,
+				"library_member": member,
+				"date": today(),
+				"type": "Issue",
+			}
+		)
+		issue.insert(ignore_permissions=True)
+		issue.submit()
+		ret = frappe.get_doc(
+			{
+				"doctype": DOCTYPE,
+				"article": copy.article,
+				"article_copy": copy.name,
+				"library_member": member,
+				"date": today(),
+				"type": "Return",
+				"issue_transaction": issue.name,
+			}
+		)
+		ret.insert(ignore_permissions=True)
+		ret.submit()
+
+	def ledger():
+		issue = record_issue(copy.article, copy.name, member)
+		record_return(issue, copy.name)
+
+	result = {"events": events}
+	for label, write in (("lifecycle", lifecycle), ("ledger", ledger)):
+		began = time.perf_counter()
+		for _ in range(events // 2):
+			write()
+		elapsed = time.perf_counter() - began
+		frappe.db.rollback()
+		result[f"{label}_events_per_second"] = round(events / elapsed, 1)
+
+	# Batched: all events in a single INSERT
+	batch = []
+	for _ in range(events // 2):
+		issue = frappe._dict(
+			type="Issue", article=copy.article, article_copy=copy.name, library_member=member
+		)
+		batch.append(issue)
+	began = time.perf_counter()
+	append(batch)
+	append(
+		[
+			frappe._dict(
+				type="Return",
+				article=issue.article,
+				article_copy=copy.name,
+				library_member=member,
+				issue_transaction=issue.name,
+			)
+			for issue in batch
+		]
+	)
+	elapsed = time.perf_counter() - began
+	frappe.db.rollback()
+	result["ledger_batch_events_per_second"] = round(events / elapsed, 1)
+	return result
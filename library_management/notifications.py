@@ -0,0 +1,146 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Membership-expiry and due-soon reminders.
+
+A daily job collects memberships ending within `membership_expiry_notice_days`
+and open loans due within `due_soon_notice_days`, groups them per member and
+queues one digest email per member. Rows are flagged
+(`expiry_notice_sent` / `due_notice_sent`) in the same transaction as the
+queued emails, and both scans start with the flag in their index, so each
+run only reads rows that have not been notified yet.
+"""
+
+import frappe
+from frappe.utils import add_days, formatdate, getdate, today
+
+from library_management.settings import get_library_setting
+
+# Members per commit: emails queued and rows flagged together
+DIGEST_CHUNK = 500
+
+
+def send_reminder_digests():
+	"""Scheduled entry point (daily)."""
+	start = getdate(today())
+	memberships = get_expiring_memberships(
+		start, add_days(start, get_library_setting("membership_expiry_notice_days"))
+	)
+	loans = get_loans_due_soon(start, add_days(start, get_library_setting("due_soon_notice_days")))
+
+	digests = {}
+	for row in memberships + loans:
+		digests.setdefault(row.library_member, frappe._dict(memberships=[], loans=[]))
+	for row in memberships:
+		digests[row.library_member].memberships.append(row)
+	for row in loans:
+		digests[row.library_member].loans.append(row)
+
+	members = list(digests)
+	sent = 0
+	for i in range(0, len(members), DIGEST_CHUNK):
+		chunk = {member: digests[member] for member in members[i : i + DIGEST_CHUNK]}
+		sent += queue_digests(chunk)
+		frappe.db.commit()
+	return sent
+
+
+def get_expiring_memberships(start, end):
+	"""Unnotified memberships ending in [start, end], flagged `renewed` when a later term exists."""
+	return frappe.db.sql(
+		"""
+		SELECT m.name, m.library_member, m.to_date,
+			EXISTS (
+				SELECT 1 FROM `tabLibrary Membership` n
+				WHERE n.library_member = m.library_member
+				AND n.to_date > m.to_date
+			) AS renewed
+		FROM `tabLibrary Membership` m
+		WHERE m.expiry_notice_sent = 0
+		AND m.to_date BETWEEN %(start)s AND %(end)s
+		""",
+		{"start": start, "end": end},
+		as_dict=True,
+	)
+
+
+def get_loans_due_soon(start, end):
+	"""Unnotified, unreturned Issues due in [start, end]."""
+	return frappe.db.sql(
+		"""
+		SELECT t.name, t.library_member, t.due_date, a.section_break_wvtm AS title
+		FROM `tabLibrary Transaction` t
+		LEFT JOIN `tabArticle` a ON a.name = t.article
+		WHERE t.due_notice_sent = 0
+		AND t.due_date BETWEEN %(start)s AND %(end)s
+		AND t.type = 'Issue'
+		AND t.docstatus = 1
+		AND NOT EXISTS (
+			SELECT 1 FROM `tabLibrary Transaction` r
+			WHERE r.issue_transaction = t.name
+			AND r.type = 'Return'
+			AND r.docstatus = 1
+		)
+		""",
+		{"start": start, "end": end},
+		as_dict=True,
+	)
+
+
+def queue_digests(digests):
+	"""Queue one email per member and flag every row in `digests` as notified."""
+	recipients = dict(
+		frappe.db.sql(
+			"SELECT name, email FROM `tabLibrary Member` WHERE name IN %(members)s",
+			{"members": list(digests)},
+		)
+	)
+
+	queued = 0
+	for member, digest in digests.items():
+		memberships = [row for row in digest.memberships if not row.renewed]
+		email = recipients.get(member)
+		if not email or not (memberships or digest.loans):
+			continue
+
+		frappe.sendmail(
+			recipients=[email],
+			subject="Your library reminders",
+			message=render_digest(memberships, digest.loans),
+			reference_doctype="Library Member",
+			reference_name=member,
+			delayed=True,
+		)
+		queued += 1
+
+	# Members without an email or with a renewed term are flagged too, so they are not rescanned
+	membership_names = [row.name for digest in digests.values() for row in digest.memberships]
+	loan_names = [row.name for digest in digests.values() for row in digest.loans]
+	if membership_names:
+		frappe.db.sql(
+			"UPDATE `tabLibrary Membership` SET expiry_notice_sent = 1 WHERE name IN %(names)s",
+			{"names": membership_names},
+		)
+	if loan_names:
+		frappe.db.sql(
+			"UPDATE `tabLibrary Transaction` SET due_notice_sent = 1 WHERE name IN %(names)s",
+			{"names": loan_names},
+		)
+	return queued
+
+
+def render_digest(memberships, loans):
+	parts = []
+	for row in memberships:
+		parts.append(
+			f"<p>Your library membership ends on <strong>{formatdate(row.to_date)}</strong>. "
+			"Renew it to keep borrowing.</p>"
+		)
+	if loans:
+		items = "".join(
+			f"<li>{frappe.utils.escape_html(row.title or '')}: due {formatdate(row.due_date)}</li>"
+			for row in loans
+		)
+		parts.append(f"<p>Loans due soon:</p><ul>{items}</ul>")
+	return "".join(parts)
@@ -0,0 +1,36 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from library_management.catalogue import make_preview
+
+BATCH_SIZE = 1000
+
+
+def execute():
+	"""Fill Article.description_preview for existing rows, one keyset batch per commit."""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	last_name = ""
+	while True:
+		articles = frappe.db.sql(
+			"""
+			SELECT name, description
+			FROM `tabArticle`
+			WHERE name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(last_name, BATCH_SIZE),
+			as_dict=True,
+		)
+		if not articles:
+			break
+
+		for article in articles:
+			frappe.db.sql(
+				"UPDATE `tabArticle` SET description_preview = %s WHERE name = %s",
+				(make_preview(article.description), article.name),
+			)
+		frappe.db.commit()
+		last_name = articles[-1].name
@@ -0,0 +1,48 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from library_management.catalogue import normalize_isbn
+
+
+def execute():
+	"""
+	Fill Article.isbn_normalized. When several Articles share an ISBN only the
+	oldest gets it (the column is unique); the rest are reported for merging.
+	"""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	articles = frappe.db.sql(
+		"""
+		SELECT name, isbn
+		FROM `tabArticle`
+		WHERE IFNULL(isbn, '') != ''
+		AND isbn_normalized IS NULL
+		ORDER BY creation, name
+		""",
+		as_dict=True,
+	)
+	taken = set(
+		frappe.db.sql_list("SELECT isbn_normalized FROM `tabArticle` WHERE isbn_normalized IS NOT NULL")
+	)
+
+	duplicates = []
+	for article in articles:
+		isbn = normalize_isbn(article.isbn)
+		if not isbn:
+			continue
+		if isbn in taken:
+			duplicates.append(f"{article.name} ({isbn})")
+			continue
+
+		taken.add(isbn)
+		frappe.db.sql(
+			"UPDATE `tabArticle` SET isbn_normalized = %s WHERE name = %s",
+			(isbn, article.name),
+		)
+
+	if duplicates:
+		frappe.log_error(
+			"Articles sharing an ISBN with an older Article",
+			"Not indexed for scanning, merge them into copies:\n" + "\n".join(duplicates),
+		)
@@ -0,0 +1,33 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from library_management.settings import get_library_setting
+
+
+def execute():
+	"""
+	Give existing open Issues a due date of `date + loan_period`, like new ones
+	get on validate. Runs after backfill_return_links, so Issues returned before
+	Returns were linked are recognised as closed and left without a due date.
+	"""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabLibrary Transaction` i
+		SET i.due_date = DATE_ADD(i.date, INTERVAL %s DAY)
+		WHERE i.type = 'Issue'
+		AND i.docstatus = 1
+		AND i.due_date IS NULL
+		AND NOT EXISTS (
+			SELECT 1 FROM (
+				SELECT issue_transaction
+				FROM `tabLibrary Transaction`
+				WHERE type = 'Return' AND docstatus = 1 AND IFNULL(issue_transaction, '') != ''
+			) r
+			WHERE r.issue_transaction = i.name
+		)
+		""",
+		(get_library_setting("loan_period"),),
+	)
@@ -0,0 +1,84 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from library_management.archive import match_legacy_returns
+
+BATCH_SIZE = 500
+
+
+def execute():
+	"""
+	Link Returns recorded before `issue_transaction` existed to their Issue,
+	pairing them like archival does, one batch of members per commit. Open-loan
+	checks only look at the link, so an unlinked Return left its Issue open.
+	"""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	last_member = ""
+	while True:
+		members = frappe.db.sql_list(
+			"""
+			SELECT DISTINCT library_member
+			FROM `tabLibrary Transaction`
+			WHERE library_member > %s
+			AND type = 'Return'
+			AND docstatus = 1
+			AND (issue_transaction IS NULL OR issue_transaction = '')
+			ORDER BY library_member
+			LIMIT %s
+			""",
+			(last_member, BATCH_SIZE),
+		)
+		if not members:
+			break
+
+		returns = frappe.db.sql(
+			"""
+			SELECT name, library_member, article, date
+			FROM `tabLibrary Transaction`
+			WHERE library_member IN %(members)s
+			AND type = 'Return'
+			AND docstatus = 1
+			AND (issue_transaction IS NULL OR issue_transaction = '')
+			ORDER BY date, creation
+			""",
+			{"members": members},
+			as_dict=True,
+		)
+		issues = frappe.db.sql(
+			"""
+			SELECT i.name, i.library_member, i.article, i.date
+			FROM `tabLibrary Transaction` i
+			WHERE i.library_member IN %(members)s
+			AND i.type = 'Issue'
+			AND i.docstatus = 1
+			AND NOT EXISTS (
+				SELECT 1 FROM `tabLibrary Transaction` r
+				WHERE r.issue_transaction = i.name AND r.docstatus = 1
+			)
+			ORDER BY i.date, i.creation
+			""",
+			{"members": members},
+			as_dict=True,
+		)
+
+		# Pair within each (member, article) so a batch stays linear in its rows
+		grouped = {}
+		for row in issues:
+			grouped.setdefault((row.library_member, row.article), ([], []))[0].append(row)
+		for row in returns:
+			grouped.setdefault((row.library_member, row.article), ([], []))[1].append(row)
+
+		links = {}
+		for group_issues, group_returns in grouped.values():
+			if group_issues and group_returns:
+				links.update(match_legacy_returns(group_issues, group_returns))
+
+		for issue, ret in links.items():
+			frappe.db.sql(
+				"UPDATE `tabLibrary Transaction` SET issue_transaction = %s WHERE name = %s",
+				(issue, ret),
+			)
+		frappe.db.commit()
+		last_member = members[-1]
@@ -0,0 +1,58 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from library_management.inventory import article_status_sql
+
+
+def execute():
+	"""Give every existing Article one copy mirroring its current status, then fill the counters."""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	articles = frappe.db.sql(
+		"""
+		SELECT a.name, a.status
+		FROM `tabArticle` a
+		WHERE NOT EXISTS (
+			SELECT 1 FROM `tabArticle Copy` c WHERE c.article = a.name
+		)
+		""",
+		as_dict=True,
+	)
+
+	now = frappe.utils.now()
+	values = [
+		(
+			frappe.generate_hash(length=10),
+			article.name,
+			article.status if article.status in ("Issued", "Reserved") else "Available",
+			now,
+			now,
+			"Administrator",
+			"Administrator",
+		)
+		for article in articles
+	]
+	frappe.db.bulk_insert(
+		"Article Copy",
+		fields=["name", "article", "status", "creation", "modified", "owner", "modified_by"],
+		values=values,
+		chunk_size=5000,
+	)
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabArticle` a
+		LEFT JOIN (
+			SELECT article,
+				COUNT(*) AS total,
+				SUM(status = 'Available') AS available
+			FROM `tabArticle Copy`
+			GROUP BY article
+		) c ON c.article = a.name
+		SET a.total_copies = IFNULL(c.total, 0),
+			a.available_copies = IFNULL(c.available, 0)
+		"""
+	)
+	# Separate single-table UPDATE: the shared expression reads the counters set above
+	frappe.db.sql(f"UPDATE `tabArticle` SET status = {article_status_sql()}")
@@ -0,0 +1,39 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+DEFAULT_BRANCH = "Main"
+
+
+def execute():
+	"""Put every existing copy and transaction in a default branch so scoping changes nothing."""
+	# DocTypes ship as fixtures, which migrate only syncs after patches have run
+	sync_fixtures("library_management")
+
+	branch = frappe.db.get_value("Library Branch", {"is_default": 1}, "name")
+	if not branch:
+		branch = (
+			frappe.db.get_value("Library Branch", DEFAULT_BRANCH, "name")
+			or frappe.get_doc(
+				{
+					"doctype": "Library Branch",
+					"branch_name": DEFAULT_BRANCH,
+					"is_default": 1,
+				}
+			)
+			.insert(ignore_permissions=True)
+			.name
+		)
+
+	frappe.db.sql(
+		"UPDATE `tabArticle Copy` SET branch = %s WHERE IFNULL(branch, '') = ''",
+		(branch,),
+	)
+	frappe.db.sql(
+		"""
+		UPDATE `tabLibrary Transaction` t
+		LEFT JOIN `tabArticle Copy` c ON c.name = t.article_copy
+		SET t.branch = IFNULL(c.branch, %s)
+		WHERE IFNULL(t.branch, '') = ''
+		""",
+		(branch,),
+	)
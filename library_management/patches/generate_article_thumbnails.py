@@ -0,0 +1,7 @@
+import frappe
+
+
+def execute():
+	"""Render thumbnails for images uploaded before the thumbnail pipeline existed."""
+	# Image processing is slow, so it runs on a worker instead of inside migrate
+	frappe.enqueue("library_management.thumbnails.backfill_thumbnails", queue="long", timeout=3600)
@@ -0,0 +1,218 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Cache prewarming after migrate and process restarts.
+
+`prewarm` runs the warmers listed in the `library_prewarm_tasks` hook (or the
+`tasks` key of the `library_prewarm` site_config entry) in parallel, each on
+its own thread and site connection, and records how long each one took.
+The popular-article warmer ranks articles by issues over the last
+`popular_days` days from the circulation rollups and fills the caches their
+pages read: the rendered fragments and the scan codes of the article and its
+copies. Its details and recommendations calls have no cache and only warm the
+database buffer pool. The catalogue warmer renders the row fragments of the
+first catalogue page, and the settings warmer loads the default branch and
+every branch's settings overrides.
+
+It is queued after every migrate. Web and background workers also queue it
+on their first request or job after a restart, at most once every
+`BOOT_INTERVAL` seconds per site, so a rolling restart warms the shared
+caches once instead of once per process.
+
+	bench set-config -p library_prewarm '{"popular_articles": 100, "popular_days": 14, "threads": 4}'
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import frappe
+from frappe.utils import add_days, today
+
+REPORT_KEY = "library_management_prewarm_report"
+BOOT_KEY = "library_management:prewarm_boot"
+BOOT_INTERVAL = 300
+
+DEFAULTS = {"popular_articles": 50, "popular_days": 30, "catalogue_articles": 50, "threads": 4}
+
+LIBRARY_DOCTYPES = (
+	"Article",
+	"Article Copy",
+	"Article Reservation",
+	"Library Member",
+	"Library Membership",
+	"Library Settings",
+	"Library Transaction",
+)
+
+PUBLIC_ROUTES = ("home", "articles-page", "article-detail", "membership")
+
+# Sites for which this process has already scheduled (or skipped) its boot-time prewarm
+_boot_checked = set()
+_boot_lock = Lock()
+
+
+def get_config():
+	return dict(DEFAULTS, **(frappe.conf.get("library_prewarm") or {}))
+
+
+def after_migrate():
+	queue_prewarm()
+
+
+def on_process_boot(*args, **kwargs):
+	"""before_request / before_job: queue one prewarm per site after a restart."""
+	site = frappe.local.site
+	if site in _boot_checked:
+		return
+	with _boot_lock:
+		# Threaded web workers can reach here from several requests at once
+		if site in _boot_checked:
+			return
+		_boot_checked.add(site)
+
+	cache = frappe.cache()
+	try:
+		if cache.set(cache.make_key(BOOT_KEY), 1, nx=True, ex=BOOT_INTERVAL):
+			# Not after commit: the first request after a restart is usually a GET, which is rolled back
+			queue_prewarm(after_commit=False)
+	except Exception:
+		# Warming is an optimisation; never fail the request or job that triggered it.
+		# Let the next request (here or in another process) try again.
+		_boot_checked.discard(site)
+		try:
+			cache.delete(cache.make_key(BOOT_KEY))
+		except Exception:
+			pass
+
+
+def queue_prewarm(after_commit=True):
+	frappe.enqueue(
+		"library_management.prewarm.prewarm",
+		queue="short",
+		job_id="library_management_prewarm",
+		deduplicate=True,
+		enqueue_after_commit=after_commit,
+	)
+
+
+def prewarm():
+	"""Run all warmers in parallel; returns and stores {task: milliseconds or error}."""
+	config = get_config()
+	tasks = config.get("tasks") or frappe.get_hooks("library_prewarm_tasks")
+	site = frappe.local.site
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=config["threads"]) as pool:
+		results = dict(zip(tasks, pool.map(lambda task: run_task(site, task), tasks), strict=True))
+
+	report = {"tasks": results, "total_ms": round((time.perf_counter() - start) * 1000, 1)}
+	frappe.db.set_global(REPORT_KEY, frappe.as_json(report))
+	frappe.db.commit()
+	frappe.logger("library_management").info(f"Cache prewarm finished: {report}")
+	return report
+
+
+def run_task(site, task):
+	"""Run one warmer on its own site connection (threads do not share frappe.local)."""
+	frappe.init(site=site)
+	frappe.connect()
+	start = time.perf_counter()
+	try:
+		frappe.get_attr(task)()
+		return round((time.perf_counter() - start) * 1000, 1)
+	except Exception as e:
+		frappe.log_error(f"Cache prewarm task {task} failed")
+		return f"failed: {e}"
+	finally:
+		frappe.destroy()
+
+
+def warm_metadata():
+	for doctype in LIBRARY_DOCTYPES:
+		frappe.get_meta(doctype)
+
+
+def warm_catalogue():
+	"""
+	Row fragments of the newest `catalogue_articles` Articles, which the first
+	catalogue page shows. The two API calls have no cache of their own; they
+	only pull the settings and listing rows into the database buffer pool.
+	"""
+	from library_management import api, fragments
+
+	api.get_library_settings()
+	api.get_articles()
+
+	for name in frappe.get_all(
+		"Article", order_by="creation desc", limit=get_config()["catalogue_articles"], pluck="name"
+	):
+		fragments.render_article_fragment(frappe.get_doc("Article", name), "row")
+
+
+def warm_settings():
+	from library_management import branches
+
+	branches.get_default_branch()
+	for branch in frappe.get_all("Library Branch", filters={"disabled": 0}, pluck="name"):
+		for fieldname in branches.BRANCH_SETTINGS:
+			branches.get_branch_setting(fieldname, branch)
+
+
+def warm_popular_articles():
+	from library_management import api, fragments, recommendations, scanning
+
+	articles = get_popular_articles()
+	barcodes = (
+		frappe.get_all(
+			"Article Copy",
+			filters={"article": ("in", [article.name for article in articles]), "barcode": ("is", "set")},
+			pluck="barcode",
+		)
+		if articles
+		else []
+	)
+
+	for article in articles:
+		api.get_article_details(article.name)
+		recommendations.get_recommendations(article.name)
+		if article.isbn_normalized:
+			scanning.resolve(article.isbn_normalized)
+
+		doc = frappe.get_doc("Article", article.name)
+		for variant in fragments.FRAGMENT_TEMPLATES:
+			fragments.render_article_fragment(doc, variant)
+
+	for barcode in barcodes:
+		scanning.resolve(barcode)
+
+
+def warm_routes():
+	from frappe.utils import set_request
+	from frappe.website.serve import get_response_content
+
+	for route in PUBLIC_ROUTES:
+		set_request(method="GET", path=f"/{route}")
+		get_response_content(route)
+
+
+def get_popular_articles():
+	config = get_config()
+	return frappe.db.sql(
+		"""
+		SELECT a.name, a.isbn_normalized
+		FROM (
+			SELECT article, SUM(issues) AS issues
+			FROM `tabArticle Circulation Daily`
+			WHERE date >= %(since)s
+			GROUP BY article
+			ORDER BY issues DESC
+			LIMIT %(limit)s
+		) popular
+		INNER JOIN `tabArticle` a ON a.name = popular.article
+		ORDER BY popular.issues DESC
+		""",
+		{"since": add_days(today(), -config["popular_days"]), "limit": config["popular_articles"]},
+		as_dict=True,
+	)
@@ -0,0 +1,148 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Opt-in profiling of library_management.api calls in production.
+
+Configured in site_config, so it can be switched on without a deploy:
+
+	bench set-config -p library_profiler '{"users": ["jane@example.com"],
+		"endpoints": ["get_rented_articles"], "sample_rate": 0.01, "retention": 500}'
+
+A request is profiled when its user or endpoint is listed, or when it is
+picked by `sample_rate`. `before_request` starts cProfile and times every
+frappe.db.sql call; `after_request` stores the result as an `API Profile`:
+the top functions by cumulative time, the SQL statements with durations and a
+compressed pstats dump that `download_profile` serves for snakeviz. An hourly
+job keeps only the newest `retention` profiles. Queries sent to a read
+replica connection are not captured.
+"""
+
+import base64
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import random
+import time
+import zlib
+
+import frappe
+
+API_PREFIX = "/api/method/library_management.api."
+DEFAULT_RETENTION = 500
+SUMMARY_LINES = 40
+MAX_QUERY_LENGTH = 2000
+
+
+def get_config():
+	return frappe.conf.get("library_profiler") or {}
+
+
+def before_request():
+	config = get_config()
+	if not config or not frappe.request or not frappe.request.path.startswith(API_PREFIX):
+		return
+
+	endpoint = frappe.request.path[len(API_PREFIX) :]
+	if not should_profile(config, endpoint):
+		return
+
+	db = frappe.db
+	queries = []
+	original_sql = db.sql
+
+	def timed_sql(query, *args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return original_sql(query, *args, **kwargs)
+		finally:
+			queries.append(
+				(round((time.perf_counter() - start) * 1000, 3), str(query).strip()[:MAX_QUERY_LENGTH])
+			)
+
+	# Instance attribute shadows the method for this connection only
+	db.sql = timed_sql
+
+	profile = cProfile.Profile()
+	frappe.local.library_profile = frappe._dict(
+		endpoint=endpoint, db=db, queries=queries, profile=profile, start=time.perf_counter()
+	)
+	profile.enable()
+
+
+def should_profile(config, endpoint):
+	if frappe.session.user in (config.get("users") or []):
+		return True
+	if endpoint in (config.get("endpoints") or []):
+		return True
+	return random.random() < (config.get("sample_rate") or 0)
+
+
+def after_request(response=None, request=None):
+	state = getattr(frappe.local, "library_profile", None)
+	if not state:
+		return
+
+	state.profile.disable()
+	duration_ms = (time.perf_counter() - state.start) * 1000
+	state.db.__dict__.pop("sql", None)
+	frappe.local.library_profile = None
+
+	try:
+		save_profile(state, duration_ms, response.status_code if response else None)
+	except Exception:
+		# Profiling must never turn a good response into an error
+		frappe.db.rollback()
+		frappe.log_error("Could not store API Profile")
+
+
+def save_profile(state, duration_ms, status_code):
+	summary = io.StringIO()
+	stats = pstats.Stats(state.profile, stream=summary)
+	stats.strip_dirs().sort_stats("cumulative").print_stats(SUMMARY_LINES)
+
+	# pstats file format is a marshalled stats dict; compressed it is a few KB
+	raw_stats = pstats.Stats(state.profile).stats
+	profile_data = base64.b64encode(zlib.compress(marshal.dumps(raw_stats), 6)).decode()
+
+	doc = frappe.get_doc(
+		{
+			"doctype": "API Profile",
+			"endpoint": state.endpoint,
+			"user": frappe.session.user,
+			"status_code": status_code,
+			"duration_ms": round(duration_ms, 3),
+			"sql_count": len(state.queries),
+			"sql_ms": round(sum(ms for ms, _ in state.queries), 3),
+			"summary": summary.getvalue(),
+			"queries": json.dumps(state.queries, indent=1),
+			"profile_data": profile_data,
+		}
+	)
+	doc.insert(ignore_permissions=True)
+	doc.db_set(
+		"download_url",
+		f"/api/method/library_management.api.download_profile?profile={doc.name}",
+		update_modified=False,
+	)
+	frappe.db.commit()
+
+
+def get_pstats_file(profile):
+	"""Raw pstats bytes of a stored profile."""
+	data = frappe.db.get_value("API Profile", profile, "profile_data")
+	return zlib.decompress(base64.b64decode(data)) if data else None
+
+
+def trim_profiles():
+	"""Scheduled entry point (hourly): keep the newest `retention` profiles."""
+	retention = get_config().get("retention") or DEFAULT_RETENTION
+	cutoff = frappe.db.sql(
+		"SELECT creation FROM `tabAPI Profile` ORDER BY creation DESC LIMIT 1 OFFSET %s",
+		(retention,),
+	)
+	if cutoff:
+		frappe.db.sql("DELETE FROM `tabAPI Profile` WHERE creation <= %s", (cutoff[0][0],))
+		frappe.db.commit()
@@ -0,0 +1,171 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Admission control for expensive API endpoints.
+
+`rate_limit(cost, concurrency)` charges every call `cost` tokens against
+Redis token buckets: one per client IP for all traffic, plus one for the
+caller. For anonymous callers that is the small guest bucket of their IP; for
+logged-in users it is a bucket per session. Crawlers hammering the catalogue
+anonymously run dry long before circulation traffic does. Opening more
+sessions or accounts does not get round the per-IP bucket.
+
+An optional `concurrency` cap bounds how many workers can be inside a heavy
+endpoint at the same time. Each admitted request holds its own slot in a
+Redis sorted set scored by its start time; slots older than CONCURRENCY_TTL
+are pruned on every entry, so a worker killed mid-request frees its slot
+after that long instead of leaking it. Rejections are answered with HTTP 429
+before any database work. If Redis is unavailable requests are let through.
+"""
+
+import functools
+import time
+
+import frappe
+
+# (capacity in tokens, refill in tokens per second)
+# IP_BUCKET is shared by everything behind one address (e.g. a branch's public wifi)
+IP_BUCKET = (1200, 20)
+GUEST_BUCKET = (60, 1)
+SESSION_BUCKET = (300, 5)
+
+# Slots older than this belong to a worker that died mid-request and are dropped
+CONCURRENCY_TTL = 120
+
+# All buckets are checked first and only charged if every one of them has enough
+# tokens, so a rejected request costs nothing.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local wait = 0
+local tokens = {}
+for i, key in ipairs(KEYS) do
+	local capacity = tonumber(ARGV[1 + 2 * i])
+	local rate = tonumber(ARGV[2 + 2 * i])
+	local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+	local available = tonumber(bucket[1]) or capacity
+	local last = tonumber(bucket[2]) or now
+	available = math.min(capacity, available + math.max(0, now - last) / 1000 * rate)
+	if available < cost then
+		wait = math.max(wait, (cost - available) / rate)
+	end
+	tokens[i] = available
+end
+if wait > 0 then
+	return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+	local capacity = tonumber(ARGV[1 + 2 * i])
+	local rate = tonumber(ARGV[2 + 2 * i])
+	redis.call('HSET', key, 'tokens', tokens[i] - cost, 'ts', now)
+	redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return 0
+"""
+
+# Prune dead slots, then take one if fewer than the limit are held
+ENTER_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+	return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+
+def rate_limit(cost=1, concurrency=None):
+	"""Token-bucket admission for a whitelisted endpoint; place it below @frappe.whitelist."""
+
+	def decorator(fn):
+		endpoint = f"{fn.__module__}.{fn.__name__}"
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			# Internal calls (jobs, prewarming) have no client to limit
+			if frappe.conf.disable_library_rate_limit or not getattr(frappe.local, "request_ip", None):
+				return fn(*args, **kwargs)
+
+			retry_after = take_tokens(cost)
+			if retry_after:
+				return too_many_requests(retry_after)
+
+			if not concurrency:
+				return fn(*args, **kwargs)
+
+			slot = enter(endpoint, concurrency)
+			if not slot:
+				return too_many_requests(1)
+			try:
+				return fn(*args, **kwargs)
+			finally:
+				leave(endpoint, slot)
+
+		return wrapper
+
+	return decorator
+
+
+def get_buckets():
+	ip = frappe.local.request_ip
+	buckets = [(f"ip:{ip}", IP_BUCKET)]
+	if frappe.session.user == "Guest":
+		buckets.append((f"guest:{ip}", GUEST_BUCKET))
+	else:
+		# Charged alongside the IP bucket, so rotating sessions cannot escape it
+		buckets.append((f"session:{frappe.session.sid}", SESSION_BUCKET))
+	return buckets
+
+
+def take_tokens(cost):
+	"""Charge `cost` tokens; returns 0 when admitted, else seconds until it would be."""
+	cache = frappe.cache()
+	buckets = get_buckets()
+	keys = [cache.make_key(f"library_management:rate_limit:{key}") for key, _ in buckets]
+	args = [int(time.time() * 1000), cost]
+	for _, (capacity, rate) in buckets:
+		args.extend((capacity, rate))
+
+	try:
+		return int(cache.register_script(TOKEN_BUCKET_SCRIPT)(keys=keys, args=args))
+	except Exception:
+		# Fail open: losing rate limiting is better than losing the catalogue
+		return 0
+
+
+def enter(endpoint, limit):
+	"""Take an in-flight slot; returns its id, or None when `limit` slots are held."""
+	cache = frappe.cache()
+	slot = frappe.generate_hash(length=12)
+	try:
+		admitted = cache.register_script(ENTER_SCRIPT)(
+			keys=[in_flight_key(endpoint)],
+			args=[int(time.time() * 1000), CONCURRENCY_TTL * 1000, limit, slot],
+		)
+	except Exception:
+		return slot
+	return slot if admitted else None
+
+
+def leave(endpoint, slot):
+	cache = frappe.cache()
+	try:
+		cache.zrem(in_flight_key(endpoint), slot)
+	except Exception:
+		pass
+
+
+def in_flight_key(endpoint):
+	return frappe.cache().make_key(f"library_management:in_flight_slots:{endpoint}")
+
+
+def too_many_requests(retry_after):
+	frappe.local.response["http_status_code"] = 429
+	return {
+		"success": False,
+		"message": f"Too many requests. Please retry in {retry_after} seconds.",
+		"retry_after": retry_after,
+	}
@@ -0,0 +1,93 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Realtime availability push.
+
+Inventory changes mark their Article as dirty. After the database commit the
+article is added to a Redis set and, unless a flush is already pending, a
+short-queue job is enqueued; a rollback discards the marks. The job waits
+until COALESCE_WINDOW has passed since the first pending change, drains the
+set, reads the counters for every dirty article in one query and publishes a
+single compact `article_availability` event to the website room. Any number
+of transitions of the same article within the window therefore reach clients
+as one update carrying the latest state.
+"""
+
+import time
+
+import frappe
+from frappe.realtime import get_website_room
+
+EVENT = "article_availability"
+PENDING_KEY = "library_management:availability_pending"
+FLUSH_FLAG_KEY = "library_management:availability_flush_queued"
+
+# Safety net: if a queued flush is lost, the next change schedules a new one
+FLUSH_FLAG_TTL = 30
+
+# Seconds changes are collected for after the first one before they are published
+COALESCE_WINDOW = 1.0
+
+
+def queue_availability_push(article):
+	"""Mark `article` as changed in the current transaction."""
+	changed = frappe.flags.setdefault("library_availability_changed", set())
+	if not changed:
+		# Both callback lists are reset by commit and rollback, so each transaction registers anew
+		frappe.db.after_commit.add(_after_commit)
+		frappe.db.after_rollback.add(_after_rollback)
+	changed.add(article)
+
+
+def _after_rollback():
+	frappe.flags.pop("library_availability_changed", None)
+
+
+def _after_commit():
+	changed = frappe.flags.pop("library_availability_changed", None)
+	if not changed:
+		return
+
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	pipe.sadd(cache.make_key(PENDING_KEY), *changed)
+	# The flag holds the time of the first pending change, where the coalescing window starts
+	pipe.set(cache.make_key(FLUSH_FLAG_KEY), time.time(), nx=True, ex=FLUSH_FLAG_TTL)
+	_, flush_not_queued = pipe.execute()
+
+	if flush_not_queued:
+		frappe.enqueue("library_management.realtime.flush_availability", queue="short")
+
+
+def flush_availability():
+	"""Drain the dirty set and publish the current counters of every article in it."""
+	cache = frappe.cache()
+	window_start = cache.get(cache.make_key(FLUSH_FLAG_KEY))
+	if window_start:
+		remaining = float(window_start) + COALESCE_WINDOW - time.time()
+		if remaining > 0:
+			time.sleep(remaining)
+
+	# Clear the flag before draining: changes landing after this point schedule their own flush
+	cache.delete(cache.make_key(FLUSH_FLAG_KEY))
+
+	pipe = cache.pipeline()
+	pipe.smembers(cache.make_key(PENDING_KEY))
+	pipe.delete(cache.make_key(PENDING_KEY))
+	members, _ = pipe.execute()
+
+	articles = [frappe.safe_decode(member) for member in members]
+	if not articles:
+		return
+
+	rows = frappe.db.sql(
+		"""
+		SELECT name, status, available_copies, total_copies
+		FROM `tabArticle`
+		WHERE name IN %(articles)s
+		""",
+		{"articles": articles},
+	)
+	# [name, status, available, total] rows keep the message small for busy catalogues
+	frappe.publish_realtime(EVENT, {"articles": [list(row) for row in rows]}, room=get_website_room())
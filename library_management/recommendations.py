@@ -0,0 +1,133 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+"Also borrowed" recommendations.
+
+A scheduled job builds a sparse member x article borrow matrix from live and
+archived Issue transactions, multiplies it by its transpose to get article
+co-occurrence counts, and stores the top-K neighbours of every article in
+`Article Recommendation`. Serving is a single lookup on (article, rank).
+"""
+
+import frappe
+from frappe.utils import now
+
+TOP_K = 10
+INSERT_CHUNK = 5000
+
+
+def get_recommendations(article, limit=5):
+	return frappe.db.sql(
+		"""
+		SELECT
+			r.recommended_article AS name,
+			a.section_break_wvtm AS title,
+			a.author,
+			a.status,
+			a.available_copies,
+			r.score
+		FROM `tabArticle Recommendation` r
+		INNER JOIN `tabArticle` a ON a.name = r.recommended_article
+		WHERE r.article = %s
+		ORDER BY r.rank
+		LIMIT %s
+		""",
+		(article, limit),
+		as_dict=True,
+	)
+
+
+def rebuild_recommendations(top_k=TOP_K):
+	"""Scheduled entry point (daily_long)."""
+	# Imported here so web workers never pay for loading NumPy/SciPy
+	import numpy as np
+	from scipy import sparse
+
+	pairs = frappe.db.sql(
+		"""
+		SELECT DISTINCT library_member, article FROM (
+			SELECT library_member, article
+			FROM `tabLibrary Transaction`
+			WHERE type = 'Issue' AND docstatus = 1
+			UNION ALL
+			SELECT library_member, article
+			FROM `tabLibrary Transaction Archive`
+			WHERE type = 'Issue'
+		) t
+		WHERE library_member IS NOT NULL AND article IS NOT NULL
+		"""
+	)
+	if not pairs:
+		return 0
+
+	members, articles = np.array(pairs, dtype=object).T
+	_, member_idx = np.unique(members, return_inverse=True)
+	article_names, article_idx = np.unique(articles, return_inverse=True)
+
+	borrowed = sparse.csr_matrix(
+		(np.ones(len(article_idx), dtype=np.int32), (member_idx, article_idx)),
+		shape=(member_idx.max() + 1, len(article_names)),
+	)
+	# co_borrowed[i, j] = number of members who borrowed both article i and article j
+	co_borrowed = (borrowed.T @ borrowed).tocsr()
+	co_borrowed.setdiag(0)
+	co_borrowed.eliminate_zeros()
+
+	rows = top_neighbours(co_borrowed, article_names, top_k)
+
+	frappe.db.sql("DELETE FROM `tabArticle Recommendation`")
+	for start in range(0, len(rows), INSERT_CHUNK):
+		frappe.db.bulk_insert(
+			"Article Recommendation",
+			fields=[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"article",
+				"recommended_article",
+				"rank",
+				"score",
+			],
+			values=rows[start : start + INSERT_CHUNK],
+		)
+	frappe.db.commit()
+	return len(rows)
+
+
+def top_neighbours(co_borrowed, article_names, top_k):
+	"""Pick the `top_k` highest-scoring neighbours of every row of a CSR matrix."""
+	import numpy as np
+
+	timestamp = now()
+	rows = []
+	for i in range(co_borrowed.shape[0]):
+		start, end = co_borrowed.indptr[i], co_borrowed.indptr[i + 1]
+		if start == end:
+			continue
+
+		scores = co_borrowed.data[start:end]
+		neighbours = co_borrowed.indices[start:end]
+		if len(scores) > top_k:
+			keep = np.argpartition(-scores, top_k)[:top_k]
+			scores, neighbours = scores[keep], neighbours[keep]
+		order = np.lexsort((neighbours, -scores))
+
+		article = article_names[i]
+		for rank, j in enumerate(order, start=1):
+			rows.append(
+				(
+					frappe.generate_hash(length=12),
+					timestamp,
+					timestamp,
+					"Administrator",
+					"Administrator",
+					article,
+					article_names[neighbours[j]],
+					rank,
+					float(scores[j]),
+				)
+			)
+	return rows
@@ -0,0 +1,151 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Read-replica routing for read-only endpoints.
+
+Uses Frappe's own replica connection (site_config `read_from_replica`,
+`replica_host`, `replica_db_port`), but only for endpoints decorated with
+`read_only(max_lag=...)`, and only when it is safe:
+
+- the replica must be less than `max_lag` seconds behind the primary;
+  the lag is read from the replica status and cached for a few seconds;
+- a user who just changed circulation data (rent, return, reservation,
+  membership) stays on the primary for `STICKY_SECONDS`, so their next page
+  load always shows their own write.
+
+Anything unexpected (no replica configured, replication stopped, status not
+readable) falls back to the primary. Reading the replica status needs the
+REPLICATION CLIENT (MariaDB >= 10.5.9: SLAVE MONITOR) privilege for the site
+database user on the replica.
+
+To try it locally, run a second MariaDB as a replica of the first, add
+`"read_from_replica": 1, "replica_host": "127.0.0.1", "replica_db_port": 3307`
+to site_config.json, and call `check_replica` with bench execute.
+"""
+
+import functools
+from contextlib import contextmanager
+
+import frappe
+
+STICKY_SECONDS = 15
+LAG_CACHE_SECONDS = 5
+LAG_CACHE_KEY = "library_management:replica_lag"
+
+# Stored when the lag cannot be determined, so callers fall back to the primary
+UNKNOWN_LAG = 10**9
+
+
+def read_only(max_lag=10):
+	"""Serve the decorated endpoint from the replica when it is fresh enough for this caller."""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			if not use_replica(max_lag):
+				return fn(*args, **kwargs)
+			with replica_connection():
+				return fn(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+@contextmanager
+def replica_connection():
+	# Nested read-only calls reuse the replica connection already in place
+	switched = frappe.connect_replica()
+	# Makes frappe.log_error defer its insert instead of writing to the replica
+	read_only_flag = frappe.flags.read_only
+	frappe.flags.read_only = True
+	try:
+		yield
+	finally:
+		frappe.flags.read_only = read_only_flag
+		if switched:
+			frappe.local.db.close()
+			frappe.local.db = frappe.local.primary_db
+			del frappe.local.replica_db
+			del frappe.local.primary_db
+
+
+@contextmanager
+def primary_connection():
+	"""Temporarily use the primary inside a replica-routed endpoint, e.g. for a rare write."""
+	replica_db = getattr(frappe.local, "replica_db", None)
+	if replica_db is None or frappe.local.db is not replica_db:
+		yield
+		return
+
+	read_only_flag = frappe.flags.read_only
+	frappe.local.db = frappe.local.primary_db
+	frappe.flags.read_only = False
+	try:
+		yield
+	finally:
+		frappe.local.db = replica_db
+		frappe.flags.read_only = read_only_flag
+
+
+def use_replica(max_lag):
+	if not frappe.conf.read_from_replica or not frappe.conf.replica_host:
+		return False
+	if is_sticky():
+		return False
+	return get_replica_lag() <= max_lag
+
+
+def stick_to_primary(doc=None, method=None):
+	"""on_change of circulation DocTypes: route the acting user's reads to the primary for a while."""
+	if frappe.session.user == "Guest":
+		return
+	frappe.cache().set_value(sticky_key(), 1, expires_in_sec=STICKY_SECONDS)
+
+
+def is_sticky():
+	if frappe.session.user == "Guest":
+		return False
+	return bool(frappe.cache().get_value(sticky_key()))
+
+
+def sticky_key():
+	return f"library_management:primary_sticky:{frappe.session.user}"
+
+
+def get_replica_lag():
+	"""Seconds the replica is behind the primary, shared across workers for a few seconds."""
+	lag = frappe.cache().get_value(LAG_CACHE_KEY)
+	if lag is None:
+		lag = read_replica_lag()
+		frappe.cache().set_value(LAG_CACHE_KEY, lag, expires_in_sec=LAG_CACHE_SECONDS)
+	return lag
+
+
+def read_replica_lag():
+	with replica_connection():
+		return _seconds_behind_master()
+
+
+def _seconds_behind_master():
+	try:
+		status = frappe.db.sql("SHOW SLAVE STATUS", as_dict=True)
+	except Exception:
+		frappe.log_error("Could not read replica status; serving reads from the primary")
+		return UNKNOWN_LAG
+
+	# No row: not a replica. NULL: replication threads stopped.
+	if not status or status[0].get("Seconds_Behind_Master") is None:
+		return UNKNOWN_LAG
+	return status[0]["Seconds_Behind_Master"]
+
+
+def check_replica():
+	"""Diagnostic for `bench execute library_management.replica.check_replica`."""
+	lag = read_replica_lag() if frappe.conf.read_from_replica and frappe.conf.replica_host else None
+	return {
+		"read_from_replica": bool(frappe.conf.read_from_replica),
+		"replica_host": frappe.conf.replica_host,
+		"lag_seconds": None if lag == UNKNOWN_LAG else lag,
+	}
@@ -0,0 +1,296 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Hold queue for Articles.
+
+Waiting reservations are ordered by (priority, requested_on, name). Placing
+and allocating holds are range scans on the (article, status, priority,
+requested_on) index. Queue positions come from a Redis sorted set per article
+that mirrors its waiting holds: every member has score 0 and the ordering key
+as its value, so ZRANK answers a position in O(log n) however long the queue
+for a popular title gets. The set is only a cache. Changes are applied after
+the database commit and only to a set that already exists, a missing set is
+rebuilt from the table on the next lookup, and a TTL bounds any drift.
+"""
+
+import frappe
+from frappe.utils import add_days, get_datetime, now, now_datetime
+
+from library_management import inventory
+from library_management.settings import get_library_setting
+
+ACTIVE_STATUSES = ("Waiting", "Allocated")
+
+# Head-of-queue candidates examined per round when skipping ineligible holders
+ALLOCATION_BATCH = 20
+
+QUEUE_KEY = "library_management:hold_queue:"
+QUEUE_TTL = 24 * 60 * 60
+
+# Keeps negative priorities sorting before positive ones in the zero-padded key
+PRIORITY_OFFSET = 10**9
+
+# Apply a queue change only to a set that exists; a rebuild reads the table anyway
+QUEUE_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+	return 0
+end
+if ARGV[1] == 'add' then
+	redis.call('ZADD', KEYS[1], 0, ARGV[2])
+else
+	redis.call('ZREM', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def get_active_reservation(article, library_member):
+	return frappe.db.get_value(
+		"Article Reservation",
+		{"article": article, "library_member": library_member, "status": ["in", ACTIVE_STATUSES]},
+		["name", "status", "article_copy"],
+		as_dict=True,
+	)
+
+
+def place_hold(article, library_member, priority=0):
+	"""Queue `library_member` for `article`; an existing active hold is returned as is."""
+	existing = get_active_reservation(article, library_member)
+	if existing:
+		return existing.name
+
+	reservation = frappe.get_doc(
+		{
+			"doctype": "Article Reservation",
+			"article": article,
+			"library_member": library_member,
+			"priority": priority,
+			"requested_on": now(),
+			"status": "Waiting",
+		}
+	)
+	reservation.insert(ignore_permissions=True)
+	queue_update(article, "add", queue_member(reservation))
+	return reservation.name
+
+
+def get_position(reservation):
+	"""1-based place in the queue, or None once the hold is no longer waiting."""
+	hold = frappe.db.get_value(
+		"Article Reservation",
+		reservation,
+		["name", "article", "status", "priority", "requested_on"],
+		as_dict=True,
+	)
+	if not hold or hold.status != "Waiting":
+		return None
+
+	cache = frappe.cache()
+	key = cache.make_key(QUEUE_KEY + hold.article)
+	rank = cache.zrank(key, queue_member(hold))
+	if rank is None:
+		# Set missing or behind the table (e.g. evicted): rebuild it once from the index
+		rebuild_queue(hold.article)
+		rank = cache.zrank(key, queue_member(hold))
+	return None if rank is None else rank + 1
+
+
+def queue_member(hold):
+	"""Sorted-set value whose byte order is the queue order (priority, requested_on, name)."""
+	requested_on = get_datetime(hold.requested_on).strftime("%Y-%m-%d %H:%M:%S.%f")
+	return f"{(hold.priority or 0) + PRIORITY_OFFSET:010d}|{requested_on}|{hold.name}"
+
+
+def rebuild_queue(article):
+	holds = frappe.db.sql(
+		"""
+		SELECT name, priority, requested_on
+		FROM `tabArticle Reservation`
+		WHERE article = %s
+		AND status = 'Waiting'
+		""",
+		(article,),
+		as_dict=True,
+	)
+	cache = frappe.cache()
+	key = cache.make_key(QUEUE_KEY + article)
+	pipe = cache.pipeline()
+	pipe.delete(key)
+	if holds:
+		pipe.zadd(key, {queue_member(hold): 0 for hold in holds})
+		pipe.expire(key, QUEUE_TTL)
+	pipe.execute()
+
+
+def queue_update(article, action, member):
+	"""Mirror a hold entering or leaving the Waiting state once the transaction commits."""
+
+	def apply():
+		cache = frappe.cache()
+		try:
+			cache.register_script(QUEUE_UPDATE_SCRIPT)(
+				keys=[cache.make_key(QUEUE_KEY + article)], args=[action, member]
+			)
+		except Exception:
+			# Positions fall back to a rebuild; the table stays authoritative
+			frappe.cache().delete_value(QUEUE_KEY + article)
+
+	frappe.db.after_commit.add(apply)
+
+
+def leave_queue(hold):
+	"""Drop a Waiting hold (with name, article, priority, requested_on) from the position set."""
+	queue_update(hold.article, "remove", queue_member(hold))
+
+
+def allocate_next(article, article_copy):
+	"""
+	Set `article_copy` aside for the first eligible waiting holder.
+	Holders without an active membership are passed over but keep their place.
+	Returns the allocated reservation name, or None if nobody is waiting.
+	"""
+	today = frappe.utils.today()
+	offset = 0
+	while True:
+		candidates = frappe.db.sql(
+			"""
+			SELECT r.name, r.article, r.library_member, r.priority, r.requested_on
+			FROM `tabArticle Reservation` r
+			WHERE r.article = %s
+			AND r.status = 'Waiting'
+			ORDER BY r.priority, r.requested_on, r.name
+			LIMIT %s OFFSET %s
+			""",
+			(article, ALLOCATION_BATCH, offset),
+			as_dict=True,
+		)
+		if not candidates:
+			return None
+
+		eligible = set(
+			frappe.db.sql_list(
+				"""
+				SELECT DISTINCT library_member
+				FROM `tabLibrary Membership`
+				WHERE library_member IN %(members)s
+				AND from_date <= %(today)s
+				AND to_date >= %(today)s
+				""",
+				{"members": [c.library_member for c in candidates], "today": today},
+			)
+		)
+		for candidate in candidates:
+			if candidate.library_member not in eligible:
+				continue
+			# Re-check under lock: a concurrent cancel may have moved this hold on
+			locked = frappe.db.sql(
+				"SELECT status FROM `tabArticle Reservation` WHERE name = %s FOR UPDATE",
+				(candidate.name,),
+			)
+			if not locked or locked[0][0] != "Waiting":
+				continue
+
+			frappe.db.set_value(
+				"Article Reservation",
+				candidate.name,
+				{"status": "Allocated", "article_copy": article_copy, "allocated_on": now()},
+				update_modified=True,
+			)
+			leave_queue(candidate)
+			inventory.set_copy_status(article_copy, "Reserved")
+			inventory.refresh_status(article)
+			return candidate.name
+
+		offset += ALLOCATION_BATCH
+
+
+def hand_over_or_release(article, article_copy):
+	"""
+	Route a copy coming back from a loan: straight to the next holder if the
+	queue is non-empty, otherwise back on the shelf. A copy that is already
+	available (a repeated return) is left alone.
+	"""
+	if inventory.get_locked_status(article_copy) in (None, "Available"):
+		return None
+
+	reservation = allocate_next(article, article_copy)
+	if not reservation:
+		inventory.set_copy_status(article_copy, "Available")
+		inventory.adjust_available(article, 1)
+	return reservation
+
+
+def collect_allocated_copy(article, library_member):
+	"""
+	Called from rent_article: if the member's hold has a copy waiting for them,
+	mark the hold fulfilled and return that copy so it is issued directly.
+	"""
+	hold = get_active_reservation(article, library_member)
+	if not hold or hold.status != "Allocated" or not hold.article_copy:
+		return None
+
+	frappe.db.set_value("Article Reservation", hold.name, "status", "Fulfilled", update_modified=True)
+	inventory.set_copy_status(hold.article_copy, "Issued")
+	inventory.refresh_status(article)
+	return hold.article_copy
+
+
+def cancel_waiting_hold(article, library_member):
+	"""Called from rent_article after a shelf rental: the member no longer needs their place in the queue."""
+	hold = get_active_reservation(article, library_member)
+	if hold and hold.status == "Waiting":
+		cancel(hold.name)
+
+
+def offer_new_copy(doc, method=None):
+	"""
+	Article Copy after_insert: a copy added while holders are waiting (add_copies,
+	desk) goes to the head of the queue instead of the shelf. Runs before the
+	on_update counter sync, which then counts it as reserved.
+	"""
+	if doc.status == "Available":
+		allocate_next(doc.article, doc.name)
+
+
+def cancel(reservation):
+	"""Withdraw a hold; an already allocated copy moves on to the next holder."""
+	hold = frappe.db.get_value(
+		"Article Reservation",
+		reservation,
+		["name", "article", "status", "article_copy", "priority", "requested_on"],
+		as_dict=True,
+	)
+	if not hold or hold.status not in ACTIVE_STATUSES:
+		return False
+
+	frappe.db.set_value("Article Reservation", hold.name, "status", "Cancelled", update_modified=True)
+	if hold.status == "Waiting":
+		leave_queue(hold)
+	elif hold.article_copy:
+		hand_over_or_release(hold.article, hold.article_copy)
+	return True
+
+
+def expire_uncollected_holds():
+	"""Daily job: allocations not collected within hold_pickup_days pass down the queue."""
+	cutoff = add_days(now_datetime(), -get_library_setting("hold_pickup_days"))
+	expired = frappe.db.sql(
+		"""
+		SELECT name, article, article_copy
+		FROM `tabArticle Reservation`
+		WHERE status = 'Allocated'
+		AND allocated_on < %s
+		""",
+		(cutoff,),
+		as_dict=True,
+	)
+	for hold in expired:
+		try:
+			frappe.db.set_value("Article Reservation", hold.name, "status", "Expired", update_modified=True)
+			if hold.article_copy:
+				hand_over_or_release(hold.article, hold.article_copy)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Error expiring reservation {hold.name}")
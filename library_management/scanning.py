@@ -0,0 +1,98 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Scan-to-article resolution for desk barcode scanners.
+
+A scanned code is either a book's ISBN/EAN-13 (resolves to an Article through
+the unique `isbn_normalized` index) or a copy's own `barcode` label (resolves
+to that Article Copy and its Article). Results are kept in a Redis hash, so a
+repeat scan never reaches the database; the hash is dropped whenever an ISBN
+or copy barcode changes.
+"""
+
+import frappe
+
+from library_management.archive import get_legacy_return
+from library_management.catalogue import normalize_isbn
+
+CACHE_KEY = "library_management:scan_codes"
+
+# Newest unlinked Issues checked against legacy Returns when resolving an open loan
+OPEN_ISSUE_CANDIDATES = 5
+
+
+def resolve(code):
+	"""{"article": ..., "article_copy": ... or None} for a scanned code, or None if unknown."""
+	code = (code or "").strip()
+	if not code:
+		return None
+
+	cached = frappe.cache().hget(CACHE_KEY, code)
+	if cached:
+		return cached
+
+	resolved = lookup(code)
+	if resolved:
+		frappe.cache().hset(CACHE_KEY, code, resolved)
+	return resolved
+
+
+def lookup(code):
+	isbn = normalize_isbn(code)
+	if isbn:
+		article = frappe.db.sql(
+			"SELECT name FROM `tabArticle` WHERE isbn_normalized = %s",
+			(isbn,),
+		)
+		if article:
+			return {"article": article[0][0], "article_copy": None}
+
+	copy = frappe.db.sql(
+		"SELECT name, article FROM `tabArticle Copy` WHERE barcode = %s",
+		(code,),
+	)
+	if copy:
+		return {"article": copy[0][1], "article_copy": copy[0][0]}
+	return None
+
+
+def clear_cache(doc=None, method=None):
+	"""Article / Article Copy on_update and after_delete."""
+	if doc and method == "on_update":
+		field = "isbn_normalized" if doc.doctype == "Article" else "barcode"
+		if not doc.has_value_changed(field):
+			return
+	frappe.cache().delete_key(CACHE_KEY)
+
+
+def get_open_issue(article_copy=None, article=None, library_member=None):
+	"""The open Issue transaction for a copy, or for an article borrowed by a member."""
+	if article_copy:
+		condition, values = "lt.article_copy = %(copy)s", {"copy": article_copy}
+	else:
+		condition = "lt.article = %(article)s AND lt.library_member = %(member)s"
+		values = {"article": article, "member": library_member}
+
+	issues = frappe.db.sql(
+		f"""
+		SELECT lt.name, lt.library_member, lt.article
+		FROM `tabLibrary Transaction` lt
+		WHERE {condition}
+		AND lt.type = 'Issue'
+		AND lt.docstatus = 1
+		AND NOT EXISTS (
+			SELECT 1 FROM `tabLibrary Transaction` r
+			WHERE r.issue_transaction = lt.name AND r.docstatus = 1
+		)
+		ORDER BY lt.creation DESC
+		LIMIT %(limit)s
+		""",
+		dict(values, limit=OPEN_ISSUE_CANDIDATES),
+		as_dict=True,
+	)
+	# Issues returned before Returns were linked still look open above; skip those
+	for issue in issues:
+		if not get_legacy_return(issue):
+			return issue.name
+	return None
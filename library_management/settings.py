@@ -0,0 +1,26 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+import frappe
+
+# Fallbacks used when Library Settings is missing or a field is left empty
+DEFAULTS = {
+	"loan_period": 14,
+	"max_articles_per_user": 3,
+	"hold_pickup_days": 3,
+	"archive_after_days": 365,
+	"archive_batch_size": 1000,
+	"change_feed_retention_days": 30,
+	"isbn_enrichment_concurrency": 8,
+	"membership_expiry_notice_days": 7,
+	"due_soon_notice_days": 2,
+}
+
+
+def get_library_setting(fieldname):
+	"""Read one Library Settings value, falling back to DEFAULTS like the API endpoints do."""
+	try:
+		value = frappe.get_single("Library Settings").get(fieldname)
+	except Exception:
+		value = None
+	return value or DEFAULTS.get(fieldname)
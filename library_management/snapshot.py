@@ -0,0 +1,170 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Static catalogue snapshot.
+
+The public catalogue is published as precompressed JSON under
+public/files/catalogue, so nginx can serve it without a Python worker:
+
+	manifest.json              page list with content hashes, status counts
+	pages/<n>.json             PAGE_SIZE listing entries, oldest first
+	status/<status>.json       names of the articles in that status
+
+Every file is written as .json, .json.gz and, when the optional `brotli`
+package is installed, .json.br, each through a temporary file and an atomic
+rename. Pages follow creation order, so a new Article only touches the last
+page. The publisher runs every minute and reads the Article entries of the
+change feed since the sequence number stored in the manifest. It rewrites
+only the pages that contain a changed Article or whose membership shifted
+(deletions), and only the status lists whose content changed. The manifest
+is written last.
+
+For nginx to pick up the compressed variants, enable `gzip_static on;`
+(and `brotli_static on;`) for the /files location.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+import frappe
+from frappe.utils import now
+
+from library_management.catalogue import LISTING_COLUMNS, format_listing_row
+from library_management.changefeed import get_head_seq
+
+FOLDER = "catalogue"
+PAGE_SIZE = 100
+STATUSES = ("Available", "Issued", "Reserved")
+
+
+def publish_catalogue(full=False):
+	"""Scheduled entry point (every minute). Returns the number of files rewritten."""
+	folder = frappe.get_site_path("public", "files", FOLDER)
+	manifest = None if full else read_manifest(folder)
+
+	head_seq = get_head_seq(manifest["seq"] if manifest else 0)
+
+	if manifest:
+		dirty = set(
+			frappe.db.sql_list(
+				"""
+				SELECT DISTINCT reference_name
+				FROM `tabLibrary Change`
+				WHERE reference_doctype = 'Article'
+				AND name > %s AND name <= %s
+				""",
+				(manifest["seq"], head_seq),
+			)
+		)
+		if not dirty:
+			return 0
+	else:
+		dirty = None
+
+	articles = frappe.db.sql("SELECT name, status FROM `tabArticle` ORDER BY creation, name")
+	ordered = [name for name, _ in articles]
+	old_pages = manifest["pages"] if manifest else []
+
+	written = 0
+	pages = []
+	for n, start in enumerate(range(0, len(ordered), PAGE_SIZE)):
+		names = ordered[start : start + PAGE_SIZE]
+		members = digest("\n".join(names).encode())
+		old = old_pages[n] if n < len(old_pages) else None
+
+		if old and dirty is not None and old["members"] == members and not dirty.intersection(names):
+			pages.append(old)
+			continue
+
+		content = encode(get_listing(names))
+		page = {"n": n, "count": len(names), "members": members, "hash": digest(content)}
+		if not old or old["hash"] != page["hash"]:
+			write_shard(folder, f"pages/{n}", content)
+			written += 1
+		pages.append(page)
+
+	# Pages past the end are left over from deleted Articles
+	for n in range(len(pages), len(old_pages)):
+		remove_shard(folder, f"pages/{n}")
+
+	statuses = {}
+	for status in STATUSES:
+		names = [name for name, article_status in articles if article_status == status]
+		content = encode(names)
+		entry = {"count": len(names), "hash": digest(content)}
+		old = (manifest or {}).get("statuses", {}).get(status)
+		if not old or old["hash"] != entry["hash"]:
+			write_shard(folder, f"status/{status.lower()}", content)
+			written += 1
+		statuses[status] = entry
+
+	write_shard(
+		folder,
+		"manifest",
+		encode(
+			{
+				"seq": head_seq,
+				"generated": now(),
+				"page_size": PAGE_SIZE,
+				"count": len(ordered),
+				"pages": pages,
+				"statuses": statuses,
+			}
+		),
+	)
+	return written
+
+
+def get_listing(names):
+	rows = frappe.db.sql(
+		f"SELECT {LISTING_COLUMNS} FROM `tabArticle` WHERE name IN %(names)s",
+		{"names": names},
+		as_dict=True,
+	)
+	by_name = {row.name: format_listing_row(row) for row in rows}
+	return [by_name[name] for name in names if name in by_name]
+
+
+def read_manifest(folder):
+	try:
+		with open(os.path.join(folder, "manifest.json"), "rb") as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		return None
+
+
+def encode(payload):
+	return json.dumps(payload, default=str, separators=(",", ":")).encode()
+
+
+def digest(content):
+	return hashlib.sha1(content).hexdigest()[:16]
+
+
+def write_shard(folder, name, content):
+	variants = {".json": content, ".json.gz": gzip.compress(content, compresslevel=9, mtime=0)}
+	try:
+		import brotli
+
+		variants[".json.br"] = brotli.compress(content)
+	except ImportError:
+		pass
+
+	path = os.path.join(folder, name)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	for suffix, data in variants.items():
+		temp_path = f"{path}{suffix}.{frappe.generate_hash(length=6)}.tmp"
+		with open(temp_path, "wb") as f:
+			f.write(data)
+		os.replace(temp_path, path + suffix)
+
+
+def remove_shard(folder, name):
+	for suffix in (".json", ".json.gz", ".json.br"):
+		try:
+			os.remove(os.path.join(folder, name + suffix))
+		except FileNotFoundError:
+			pass
@@ -0,0 +1,49 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+from datetime import datetime
+
+from frappe.tests import UnitTestCase
+
+from library_management.catalogue_index import CatalogueIndex
+
+
+class UnitTestCatalogueIndex(UnitTestCase):
+	"""Unit tests for the in-worker columnar catalogue index."""
+
+	def make_index(self):
+		index = CatalogueIndex()
+		index.apply(
+			[
+				("ART-1", "Beta", "Ann Lee", "Pub", "Available", datetime(2024, 1, 1)),
+				("ART-2", "alpha", " ann lee ", "Other", "Issued", datetime(2024, 1, 2)),
+				("ART-3", "Gamma", "Bob", "Pub", "Available", datetime(2024, 1, 3)),
+			]
+		)
+		return index
+
+	def test_index_sorts_by_creation_and_title(self):
+		index = self.make_index()
+		self.assertEqual(index.query(), (3, ["ART-3", "ART-2", "ART-1"]))
+		# Titles sort case-insensitively
+		self.assertEqual(index.query(sort="title", descending=False), (3, ["ART-2", "ART-1", "ART-3"]))
+		self.assertEqual(index.query(start=1, limit=1), (3, ["ART-2"]))
+
+	def test_index_filters(self):
+		index = self.make_index()
+		self.assertEqual(index.query(author="ANN LEE"), (2, ["ART-2", "ART-1"]))
+		self.assertEqual(index.query(status="Available", publisher="Pub"), (2, ["ART-3", "ART-1"]))
+		self.assertEqual(index.query(author="Nobody"), (0, []))
+		self.assertEqual(index.status_counts(), {"Available": 2, "Issued": 1, "Reserved": 0})
+
+	def test_index_updates_and_deletes(self):
+		index = self.make_index()
+		index.apply([("ART-3", "Gamma", "Bob", "Pub", "Reserved", datetime(2024, 1, 3))], deleted=["ART-1"])
+		self.assertEqual(index.query(), (2, ["ART-3", "ART-2"]))
+		self.assertEqual(index.query(status="Available"), (0, []))
+		self.assertEqual(index.status_counts(), {"Available": 0, "Issued": 1, "Reserved": 1})
+
+		# A deleted name that comes back reuses its slot
+		index.apply([("ART-1", "Beta", "Ann Lee", "Pub", "Available", datetime(2024, 1, 1))])
+		self.assertEqual(index.query(), (3, ["ART-3", "ART-2", "ART-1"]))
+		self.assertEqual(len(index.names), 3)
@@ -0,0 +1,63 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from library_management.changefeed import get_changes_since, settled_prefix
+
+CUTOFF = datetime(2024, 6, 1, 12, 0)
+SETTLED = CUTOFF - timedelta(minutes=1)
+RECENT = CUTOFF + timedelta(minutes=1)
+
+
+def entry(seq, creation, docname="ART-1", doctype="Article", action="Update"):
+	return frappe._dict(seq=seq, doctype=doctype, docname=docname, action=action, creation=creation)
+
+
+class UnitTestChangefeed(UnitTestCase):
+	"""Unit tests for sequence gap handling in the change feed."""
+
+	def test_contiguous_entries_are_settled(self):
+		entries = [entry(11, RECENT), entry(12, RECENT), entry(13, RECENT)]
+		self.assertEqual(settled_prefix(entries, 10, CUTOFF), entries)
+
+	def test_recent_gap_holds_the_feed_back(self):
+		entries = [entry(11, RECENT), entry(13, RECENT), entry(14, RECENT)]
+		# 12 may still commit, so nothing after it is served yet
+		self.assertEqual([e.seq for e in settled_prefix(entries, 10, CUTOFF)], [11])
+
+	def test_gap_at_the_start_holds_the_feed_back(self):
+		self.assertEqual(settled_prefix([entry(12, RECENT)], 10, CUTOFF), [])
+
+	def test_old_gap_is_skipped(self):
+		# The entry after the gap is older than GAP_TIMEOUT: 12 was rolled back or compacted away
+		entries = [entry(11, SETTLED), entry(13, SETTLED), entry(15, RECENT)]
+		self.assertEqual([e.seq for e in settled_prefix(entries, 10, CUTOFF)], [11, 13])
+
+	def test_changes_since_stops_at_a_pending_gap_and_attaches_current_state(self):
+		now = datetime.now()
+		log = [
+			entry(6, now, docname="ART-1"),
+			entry(7, now, docname="ART-2", action="Delete"),
+			entry(9, now, docname="ART-3"),
+		]
+		db = MagicMock()
+		db.sql.return_value = log
+		current = [frappe._dict(name="ART-1", status="Issued")]
+
+		with patch.object(frappe, "db", db), patch.object(frappe, "get_all", return_value=current) as get_all:
+			changes = get_changes_since(5)
+
+		self.assertEqual(
+			changes,
+			[
+				{"seq": 6, "doctype": "Article", "docname": "ART-1", "action": "Update", "data": current[0]},
+				{"seq": 7, "doctype": "Article", "docname": "ART-2", "action": "Delete", "data": None},
+			],
+		)
+		# ART-3 is behind the gap, so its current state is not read
+		self.assertEqual(sorted(get_all.call_args.kwargs["filters"]["name"][1]), ["ART-1", "ART-2"])
@@ -0,0 +1,94 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import UnitTestCase
+
+from library_management.idempotency import idempotent
+
+
+class DictCache:
+	"""The subset of the Redis client the decorator uses, without expiry."""
+
+	def __init__(self):
+		self.data = {}
+
+	def make_key(self, key):
+		return key
+
+	def get(self, key):
+		return self.data.get(key)
+
+	def set(self, key, value, nx=False, ex=None):
+		if nx and key in self.data:
+			return None
+		self.data[key] = value
+		return True
+
+	def delete(self, key):
+		self.data.pop(key, None)
+
+
+class UnitTestIdempotency(UnitTestCase):
+	"""Unit tests for replaying responses to repeated idempotency keys."""
+
+	def setUp(self):
+		self.cache = DictCache()
+		self.response = frappe._dict()
+		self.fingerprint = "payload-1"
+		for patcher in (
+			patch.object(frappe, "cache", return_value=self.cache),
+			patch.object(frappe.local, "response", self.response, create=True),
+			patch("library_management.idempotency.get_request_key", return_value="key-1"),
+			patch("library_management.idempotency.get_fingerprint", side_effect=lambda: self.fingerprint),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def make_endpoint(self, result=None, during=None):
+		calls = []
+
+		@idempotent()
+		def rent_article():
+			calls.append(1)
+			if during:
+				return during()
+			return dict(result or {"success": True, "message": "Rented"})
+
+		return rent_article, calls
+
+	def test_successful_response_is_replayed(self):
+		endpoint, calls = self.make_endpoint()
+		self.assertEqual(endpoint(), {"success": True, "message": "Rented"})
+		self.assertEqual(endpoint(), {"success": True, "message": "Rented", "idempotent_replay": True})
+		self.assertEqual(len(calls), 1)
+
+	def test_failed_response_is_not_stored(self):
+		endpoint, calls = self.make_endpoint({"success": False, "message": "No copy available"})
+		endpoint()
+		self.assertEqual(endpoint(), {"success": False, "message": "No copy available"})
+		self.assertEqual(len(calls), 2)
+
+	def test_retry_while_in_flight_gets_409(self):
+		retry = {}
+
+		def during():
+			retry.update(endpoint())
+			return {"success": True}
+
+		endpoint, calls = self.make_endpoint(during=during)
+		self.assertEqual(endpoint(), {"success": True})
+		self.assertFalse(retry["success"])
+		self.assertIn("still being processed", retry["message"])
+		self.assertEqual(self.response.http_status_code, 409)
+		self.assertEqual(len(calls), 1)
+
+	def test_key_reused_with_another_payload_gets_422(self):
+		endpoint, calls = self.make_endpoint()
+		endpoint()
+		self.fingerprint = "payload-2"
+		self.assertFalse(endpoint()["success"])
+		self.assertEqual(self.response.http_status_code, 422)
+		self.assertEqual(len(calls), 1)
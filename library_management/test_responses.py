@@ -0,0 +1,39 @@
+# Copyright (c) 2025, Yasser Bousrih and Contributors
+# See license.txt
+
+import gzip
+from datetime import datetime
+
+from frappe.tests import UnitTestCase
+
+from library_management.responses import compress, to_columns
+
+
+class UnitTestResponses(UnitTestCase):
+	"""Unit tests for the columnar list encoding and response compression."""
+
+	def test_columnar_listing_round_trip(self):
+		rows = [
+			{"name": "ART-1", "title": "Beta", "available_copies": 2, "creation": datetime(2024, 1, 1)},
+			{"name": "ART-2", "title": None, "available_copies": 0, "creation": datetime(2024, 1, 2)},
+		]
+		columns = to_columns(rows)
+		self.assertEqual(columns["fields"], ["name", "title", "available_copies", "creation"])
+		self.assertEqual([dict(zip(columns["fields"], row, strict=True)) for row in columns["rows"]], rows)
+
+	def test_columnar_empty_and_ragged_rows(self):
+		self.assertEqual(to_columns([]), {"fields": [], "rows": []})
+		# Fields come from the first row; keys missing later become None
+		self.assertEqual(
+			to_columns([{"a": 1, "b": 2}, {"a": 3}]), {"fields": ["a", "b"], "rows": [[1, 2], [3, None]]}
+		)
+
+	def test_columnar_compression_negotiation(self):
+		small = b"{}"
+		self.assertEqual(compress(small, "gzip"), (small, None))
+
+		body = b'{"rows":[' + b",".join(b'["ART-1","Beta",2]' for _ in range(200)) + b"]}"
+		compressed, encoding = compress(body, "deflate, gzip;q=0.8")
+		self.assertEqual(encoding, "gzip")
+		self.assertEqual(gzip.decompress(compressed), body)
+		self.assertEqual(compress(body, "identity"), (body, None))
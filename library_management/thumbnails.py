@@ -0,0 +1,128 @@
+# Copyright (c) 2025, Yasser Bousrih and contributors
+# For license information, please see license.txt
+
+"""
+Article image thumbnails.
+
+When an Article's attached image changes, a short-queue job renders it at a
+few fixed widths as WebP into public/files/thumbnails. File names are derived
+from a hash of the image content, so re-uploading the same scan reuses the
+existing files and the URLs can be cached by browsers forever. The hash is
+stored on the Article (`image_hash`), which lets the listing build thumbnail
+URLs without touching the filesystem.
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+import frappe
+
+from library_management.changefeed import record_change
+
+WIDTHS = (160, 320, 640)
+THUMBNAIL_FOLDER = "thumbnails"
+WEBP_QUALITY = 80
+
+
+def on_article_update(doc, method=None):
+	"""Article on_update: regenerate thumbnails when the attached image changes."""
+	if not doc.has_value_changed("attach_image_pfdz"):
+		return
+
+	if doc.attach_image_pfdz:
+		frappe.enqueue(
+			"library_management.thumbnails.generate_for_article",
+			queue="short",
+			article=doc.name,
+			enqueue_after_commit=True,
+		)
+	elif doc.image_hash:
+		set_image_hash(doc.name, None)
+
+
+def generate_for_article(article):
+	file_url = frappe.db.get_value("Article", article, "attach_image_pfdz")
+	content = get_local_file_content(file_url)
+	if not content:
+		return
+
+	digest = hashlib.sha256(content).hexdigest()[:20]
+	write_variants(content, digest)
+	set_image_hash(article, digest)
+
+
+def set_image_hash(article, digest):
+	frappe.db.set_value("Article", article, "image_hash", digest, update_modified=False)
+	# modified is left alone, so tell change-feed consumers (catalogue snapshot) explicitly
+	record_change("Article", article)
+
+
+def get_local_file_content(file_url):
+	# Remote URLs are left alone: they are not ours to fetch and cache
+	if not file_url or not file_url.startswith(("/files/", "/private/files/")):
+		return None
+
+	file_name = frappe.db.get_value("File", {"file_url": file_url}, "name")
+	if not file_name:
+		return None
+	return frappe.get_doc("File", file_name).get_content()
+
+
+def write_variants(content, digest):
+	from PIL import Image, ImageOps
+
+	folder = frappe.get_site_path("public", "files", THUMBNAIL_FOLDER)
+	os.makedirs(folder, exist_ok=True)
+
+	missing = [
+		width for width in WIDTHS if not os.path.exists(os.path.join(folder, variant_name(digest, width)))
+	]
+	if not missing:
+		return
+
+	with Image.open(BytesIO(content)) as source:
+		image = ImageOps.exif_transpose(source)
+		if image.mode not in ("RGB", "RGBA"):
+			image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+		for width in missing:
+			variant = image.copy()
+			# Never upscale: small originals are only re-encoded
+			variant.thumbnail((width, width * 4), Image.LANCZOS)
+			path = os.path.join(folder, variant_name(digest, width))
+			# Write then rename so a concurrent request never sees a half-written file
+			temp_path = f"{path}.{frappe.generate_hash(length=6)}.tmp"
+			variant.save(temp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+			os.replace(temp_path, path)
+
+
+def variant_name(digest, width):
+	return f"{digest}-{width}.webp"
+
+
+def get_thumbnail_urls(image_hash):
+	"""{width: url} for an Article's `image_hash`, or an empty dict if none were generated."""
+	if not image_hash:
+		return {}
+	return {width: f"/files/{THUMBNAIL_FOLDER}/{variant_name(image_hash, width)}" for width in WIDTHS}
+
+
+def get_srcset(image_hash):
+	return ", ".join(f"{url} {width}w" for width, url in get_thumbnail_urls(image_hash).items())
+
+
+def backfill_thumbnails():
+	"""Generate thumbnails for every Article with an image but no `image_hash` yet."""
+	articles = frappe.get_all(
+		"Article",
+		filters={"attach_image_pfdz": ["is", "set"], "image_hash": ["is", "not set"]},
+		pluck="name",
+	)
+	for article in articles:
+		try:
+			generate_for_article(article)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Thumbnail generation failed for Article {article}")